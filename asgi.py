@@ -0,0 +1,212 @@
+"""ASGI entry point: the apps mounted by wsgi.py behind an asyncio front end.
+
+    uvicorn asgi:application --workers 4        (or: hypercorn asgi:application)
+    python asgi.py [--host 127.0.0.1] [--port 8000] [--workers 4]
+
+Connections live on the event loop: request bodies are read and responses
+written with await, so a slow client costs a coroutine, not a thread. The
+Flask handlers still run synchronously, on executor threads, and only
+while they work: the response is pulled from the app one batch at a time
+and each batch is sent before the next one is produced. Storage reads and
+writes therefore never block the loop, and writes from many concurrent
+requests are coalesced by JSONFile's group commit and the history
+write-behind. CPU-heavy routes get their own executor so they cannot
+starve storage-bound requests; factorials and large bulk passphrase jobs
+continue into the process pools behind them. Without an ASGI server, run
+wsgi.py instead.
+"""
+import argparse
+import asyncio
+import contextvars
+import io
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import wsgi
+
+IO_THREADS = int(os.environ.get("ASGI_IO_THREADS", 32))
+CPU_THREADS = int(os.environ.get("ASGI_CPU_THREADS", os.cpu_count() or 1))
+MAX_BODY = int(os.environ.get("ASGI_MAX_BODY", 16 * 1024 * 1024))
+SEND_BATCH = 64 * 1024  # response bytes pulled from the app per executor hop
+
+# (method, path) pairs run on the CPU executor; everything else is storage-bound
+CPU_ROUTES = {
+    ("POST", "/calculator/"),
+    ("POST", "/calculator/api/evaluate"),
+    ("POST", "/passwords/"),
+    ("GET", "/passwords/api/passphrases"),
+}
+
+# ======================= WSGI Helpers ======================= #
+def build_environ(scope, body):
+    root = scope.get("root_path", "")
+    path = scope["path"]
+    if root and path.startswith(root):
+        path = path[len(root):]
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": root.encode("utf-8").decode("latin-1"),
+        "PATH_INFO": path.encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": client[0],
+        "REMOTE_PORT": str(client[1]),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    for name, value in scope.get("headers", []):
+        key = name.decode("latin-1").upper().replace("-", "_")
+        if key not in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+            key = "HTTP_" + key
+        value = value.decode("latin-1")
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    # The body has been read in full (and de-chunked) already
+    environ.pop("HTTP_TRANSFER_ENCODING", None)
+    environ["CONTENT_LENGTH"] = str(len(body))
+    return environ
+
+class _Started:
+    """What the app passed to start_response, plus anything given to the legacy write()."""
+
+    def __init__(self):
+        self.status = None
+        self.headers = None
+        self.written = []
+
+    def start_response(self, status, headers, exc_info=None):
+        if exc_info and self.status is not None:
+            raise exc_info[1].with_traceback(exc_info[2])
+        self.status = int(status.split(" ", 1)[0])
+        self.headers = [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers]
+        return self.written.append
+
+def _pull(chunks, limit=SEND_BATCH):
+    """Up to `limit` bytes from the response iterator -> (data, finished)."""
+    parts, size = [], 0
+    for chunk in chunks:
+        if chunk:
+            parts.append(chunk)
+            size += len(chunk)
+            if size >= limit:
+                return b"".join(parts), False
+    return b"".join(parts), True
+
+def _start(app, environ, started):
+    body = app(environ, started.start_response)
+    chunks = iter(body)
+    data, finished = _pull(chunks)  # generators only call start_response once iterated
+    return body, chunks, b"".join(started.written) + data, finished
+
+def _close(body):
+    if hasattr(body, "close"):
+        body.close()
+
+# ======================= ASGI Bridge ======================= #
+class WSGIBridge:
+    """Serves a WSGI app over ASGI (http and lifespan) without a thread per connection.
+
+    Each request gets one contextvars context that every executor hop runs
+    in, so Flask's request context and stream_with_context work even though
+    successive batches may be produced on different threads.
+    """
+
+    def __init__(self, app, io_threads=IO_THREADS, cpu_threads=CPU_THREADS, cpu_routes=CPU_ROUTES, max_body=MAX_BODY):
+        self.app = app
+        self.io = ThreadPoolExecutor(io_threads, thread_name_prefix="asgi-io")
+        self.cpu = ThreadPoolExecutor(cpu_threads, thread_name_prefix="asgi-cpu")
+        self.cpu_routes = set(cpu_routes)
+        self.max_body = max_body
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self._lifespan(receive, send)
+        if scope["type"] == "websocket":
+            return await send({"type": "websocket.close", "code": 1003})
+        if scope["type"] != "http":
+            raise ValueError(f"Unsupported ASGI scope type: {scope['type']}")
+
+        body = []
+        size = 0
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            body.append(message.get("body", b""))
+            size += len(body[-1])
+            if size > self.max_body:
+                return await self._simple(send, 413, b"Request body too large")
+            if not message.get("more_body"):
+                break
+
+        environ = build_environ(scope, b"".join(body))
+        executor = self.cpu if (environ["REQUEST_METHOD"], environ["PATH_INFO"]) in self.cpu_routes else self.io
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        run = lambda fn, *args: loop.run_in_executor(executor, context.run, fn, *args)
+
+        started = _Started()
+        response, chunks, data, finished = await run(_start, self.app, environ, started)
+        disconnected = asyncio.Event()
+        watcher = asyncio.create_task(self._watch(receive, disconnected))
+        try:
+            await send({"type": "http.response.start", "status": started.status, "headers": started.headers})
+            while True:
+                await send({"type": "http.response.body", "body": data, "more_body": not finished})
+                if finished or disconnected.is_set():
+                    break
+                data, finished = await run(_pull, chunks)
+        finally:
+            watcher.cancel()
+            await run(_close, response)
+
+    @staticmethod
+    async def _watch(receive, disconnected):
+        # Stop producing a streamed body as soon as its client goes away
+        while (await receive())["type"] != "http.disconnect":
+            pass
+        disconnected.set()
+
+    @staticmethod
+    async def _simple(send, status, body):
+        await send({"type": "http.response.start", "status": status,
+                    "headers": [(b"content-type", b"text/plain"), (b"content-length", str(len(body)).encode())]})
+        await send({"type": "http.response.body", "body": body})
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                # Let running handlers finish; their queued history writes flush at exit
+                await asyncio.get_running_loop().run_in_executor(None, self.close)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    def close(self):
+        self.io.shutdown(wait=True)
+        self.cpu.shutdown(wait=True)
+
+application = WSGIBridge(wsgi.application)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve all three apps over ASGI (needs uvicorn).")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+    try:
+        import uvicorn
+    except ImportError:
+        sys.exit("uvicorn is not installed; `python wsgi.py` serves the same apps over WSGI")
+    uvicorn.run("asgi:application", host=args.host, port=args.port, workers=args.workers, lifespan="on")
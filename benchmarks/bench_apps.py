@@ -0,0 +1,334 @@
+"""Request latency, throughput and memory of the three apps, in-process and over HTTP.
+
+    python benchmarks/bench_apps.py [--tasks 10000 100000] [--store json] [--requests 200]
+                                    [--target client server] [--workers 4] [--concurrency 8]
+                                    [--output results.json] [--compare baseline.json]
+
+Each --tasks size gets a scratch directory with a synthetic task store,
+calculator history and passphrase history. Every scenario is timed through
+Flask's test client ("client") and through a pre-forked local WSGI server
+with --workers processes that share one listening socket ("server").
+Reported per scenario: p50/p95/p99 and mean latency, requests per second,
+and peak RSS (of this process for client runs, the largest worker for
+server runs). Save a run with --output on one commit and pass that file
+to --compare on another, on the same machine.
+"""
+import argparse
+import importlib
+import json
+import logging
+import os
+import platform
+import random
+import resource
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("CALC_POOL_WORKERS", "0")  # keep calculator work inline, as in bench_numeric_modes
+os.environ.setdefault("PASSGEN_WORKERS", "1")
+
+WORDS = ["report", "invoice", "meeting", "review", "deploy", "backup", "budget", "design",
+         "email", "call", "plan", "test", "draft", "order", "update", "fix"]
+PRIORITIES = ["High", "Medium", "Low"]
+
+# (app, scenario, method, path, form or JSON body); reads first, writes last
+SCENARIOS = [
+    ("todo_app", "index", "GET", "/", None),
+    ("todo_app", "index search", "GET", "/?search=report", None),
+    ("todo_app", "index pending", "GET", "/?status=Pending", None),
+    ("todo_app", "api page", "GET", "/api/tasks?limit=100", None),
+    ("todo_app", "add", "POST", "/add", {"title": "Benchmark task", "description": "", "priority": "Low"}),
+    ("calculator_app", "basic", "POST", "/", {"form_type": "basic", "num1": "12.5", "num2": "3", "operation": "*"}),
+    ("calculator_app", "scientific", "POST", "/", {"form_type": "scientific", "num": "0.5", "operation": "sin"}),
+    ("calculator_app", "expression", "POST", "/", {"form_type": "expression", "expression": "(3.5**2 - 1)/7 + sqrt(2)*pi"}),
+    ("calculator_app", "api vector", "POST", "/api/evaluate",
+     {"json": {"expression": "sin(x)*exp(-x)", "inputs": {"x": [i / 100 for i in range(1000)]}}}),
+    ("password_generator", "generate", "POST", "/", {"words": "4", "sep": "-", "capitalize": "on", "add_number": "on"}),
+    ("password_generator", "bulk 10k", "GET", "/api/passphrases?count=10000", None),
+]
+
+# ======================= Fixtures ======================= #
+def make_fixtures(directory, tasks, backend):
+    """Write `tasks` synthetic tasks plus full calculator/passphrase histories into `directory`."""
+    from task_store import open_store
+    rng = random.Random(tasks)  # same fixture for the same size on every run
+    path = os.path.join(directory, "tasks.db" if backend == "sqlite" else "tasks.json")
+    rows = []
+    for i in range(tasks):
+        done = rng.random() < 0.4
+        rows.append({
+            "title": f"{rng.choice(WORDS).capitalize()} {rng.choice(WORDS)} #{i}",
+            "description": " ".join(rng.choices(WORDS, k=rng.randint(0, 8))),
+            "priority": rng.choice(PRIORITIES),
+            "status": "Completed" if done else "Pending",
+            "created_at": "2024-01-01 09:00:00",
+            "completed_at": "2024-01-02 17:00:00" if done else None,
+        })
+    store = open_store(backend, path)
+    store.save(rows)
+    with open(os.path.join(directory, "history.json"), "w") as f:
+        json.dump([f"{i} + {i} = {2 * i}" for i in range(10)], f)
+    with open(os.path.join(directory, "pass_history.json"), "w") as f:
+        json.dump([{"phrase": f"Apple-Beach-Chair-Dance-{1000 + i}", "time": "2024-01-01 09:00:00"} for i in range(20)],
+                  f, indent=2)
+    return path
+
+# ======================= Measurement ======================= #
+def reset_peak_rss():
+    # Linux lets a process reset its own high-water mark; elsewhere the peak is cumulative
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+def peak_rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    k = max(0, min(len(sorted_values) - 1, round(p / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[k]
+
+def summarize(latencies, elapsed, errors):
+    ordered = sorted(latencies)
+    ms = lambda v: None if v is None else round(v * 1000, 3)
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "p50_ms": ms(percentile(ordered, 50)),
+        "p95_ms": ms(percentile(ordered, 95)),
+        "p99_ms": ms(percentile(ordered, 99)),
+        "mean_ms": ms(sum(ordered) / len(ordered)) if ordered else None,
+        "rps": round(len(ordered) / elapsed, 1) if elapsed else None,
+    }
+
+def split_body(body):
+    if body and "json" in body:
+        return None, body["json"]
+    return body, None
+
+# ======================= Test Client ======================= #
+def bench_client(apps, requests, warmup):
+    rows = []
+    for app_name, scenario, method, path, body in SCENARIOS:
+        client = apps[app_name].test_client()
+        data, payload = split_body(body)
+
+        def send():
+            response = client.open(path, method=method, data=data, json=payload)
+            response.get_data()  # drain streamed bodies
+            return response.status_code < 400
+
+        for _ in range(warmup):
+            send()
+        reset_peak_rss()
+        latencies, errors = [], 0
+        start = time.perf_counter()
+        for _ in range(requests):
+            t = time.perf_counter()
+            ok = send()
+            latencies.append(time.perf_counter() - t)
+            errors += not ok
+        row = summarize(latencies, time.perf_counter() - start, errors)
+        row.update(app=app_name, scenario=scenario, target="client", peak_rss_mb=round(peak_rss_mb(), 1))
+        rows.append(row)
+    return rows
+
+# ======================= Local Server ======================= #
+def serve(module, port, workers):
+    """Serve `module` with wsgi.serve (pre-forked workers on one socket); print the largest worker RSS at exit.
+
+    Each worker imports the app and calls create_app() after the fork, so
+    no threads or open files are shared.
+    """
+    from wsgi import serve as serve_forked
+
+    def load_app():
+        logging.getLogger("werkzeug").setLevel(logging.ERROR)  # no per-request access log
+        return importlib.import_module(module).create_app()
+
+    serve_forked(load_app, "127.0.0.1", port, workers)
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    print(json.dumps({"peak_rss_mb": round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)}), flush=True)
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_server(module, workers, directory, env):
+    port = free_port()
+    proc = subprocess.Popen([sys.executable, os.path.abspath(__file__), "serve", module, str(port), str(workers)],
+                            cwd=directory, env=env, stdout=subprocess.PIPE, text=True)
+    if not proc.stdout.readline().startswith("Serving on"):
+        proc.kill()
+        raise RuntimeError(f"{module} server did not start")
+    return proc, f"http://127.0.0.1:{port}"
+
+def stop_server(proc):
+    proc.send_signal(signal.SIGTERM)
+    out, _ = proc.communicate(timeout=30)
+    return json.loads(out.strip().splitlines()[-1])["peak_rss_mb"]
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    # Redirects after POST are not followed: only the handler itself is timed
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+OPENER = urllib.request.build_opener(NoRedirect)
+
+def http_request(base, method, path, body):
+    data, payload = split_body(body)
+    headers = {}
+    if payload is not None:
+        raw, headers["Content-Type"] = json.dumps(payload).encode(), "application/json"
+    elif data is not None:
+        raw, headers["Content-Type"] = urlencode(data).encode(), "application/x-www-form-urlencoded"
+    else:
+        raw = None
+    request = urllib.request.Request(base + path, data=raw, method=method, headers=headers)
+    start = time.perf_counter()
+    try:
+        with OPENER.open(request, timeout=60) as response:
+            response.read()
+        ok = True
+    except urllib.error.HTTPError as e:
+        ok = e.code < 400
+    except OSError:
+        ok = False
+    return time.perf_counter() - start, ok
+
+def bench_server(directory, env, requests, warmup, workers, concurrency):
+    rows = []
+    for module in dict.fromkeys(app for app, *_ in SCENARIOS):
+        proc, base = start_server(module, workers, directory, env)
+        results = []
+        try:
+            with ThreadPoolExecutor(concurrency) as pool:
+                for app_name, scenario, method, path, body in SCENARIOS:
+                    if app_name != module:
+                        continue
+                    list(pool.map(lambda _: http_request(base, method, path, body), range(warmup)))
+                    start = time.perf_counter()
+                    samples = list(pool.map(lambda _: http_request(base, method, path, body), range(requests)))
+                    row = summarize([t for t, _ in samples], time.perf_counter() - start,
+                                    sum(not ok for _, ok in samples))
+                    row.update(app=app_name, scenario=scenario, target="server", workers=workers,
+                               concurrency=concurrency)
+                    results.append(row)
+        finally:
+            peak = stop_server(proc)
+        for row in results:
+            row["peak_rss_mb"] = peak  # per server, not per scenario
+        rows.extend(results)
+    return rows
+
+# ======================= Reporting ======================= #
+def key(row):
+    return (row["tasks"], row["target"], row["app"], row["scenario"])
+
+def print_rows(rows, baseline=None):
+    base = {key(r): r for r in (baseline or [])}
+    print(f"{'tasks':>7}  {'target':<6}  {'app':<18} {'scenario':<14} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+          f" {'req/s':>9} {'RSS MB':>8} {'err':>4}" + ("  vs baseline (p50, req/s)" if baseline else ""))
+    for row in rows:
+        line = (f"{row['tasks']:>7}  {row['target']:<6}  {row['app']:<18} {row['scenario']:<14} {row['p50_ms']:>9}"
+                f" {row['p95_ms']:>9} {row['p99_ms']:>9} {row['rps']:>9} {row['peak_rss_mb']:>8} {row['errors']:>4}")
+        old = base.get(key(row))
+        if old and old["p50_ms"] and old["rps"]:
+            line += f"  {row['p50_ms'] / old['p50_ms'] - 1:+.1%}, {row['rps'] / old['rps'] - 1:+.1%}"
+        print(line)
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, nargs="+", default=[10_000, 100_000], help="fixture sizes")
+    parser.add_argument("--store", choices=["json", "sqlite"], default="json")
+    parser.add_argument("--requests", type=int, default=200, help="timed requests per scenario")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--target", nargs="+", choices=["client", "server"], default=["client", "server"])
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="server worker processes")
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent HTTP clients")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="a previous --output file to show changes against")
+    parser.add_argument("--keep", action="store_true", help="keep the fixture directories")
+    args = parser.parse_args()
+
+    rows = []
+    scratch = tempfile.mkdtemp(prefix="bench_apps-")
+    try:
+        for tasks in args.tasks:
+            directory = os.path.join(scratch, str(tasks))
+            os.makedirs(directory)
+            store_path = make_fixtures(directory, tasks, args.store)
+            env = dict(os.environ, TODO_STORE=args.store, PYTHONPATH=ROOT,
+                       **{"TODO_DB" if args.store == "sqlite" else "TODO_FILE": store_path})
+            found = []
+            if "client" in args.target:
+                # Run in a child so every size starts from freshly imported apps
+                proc = subprocess.run([sys.executable, os.path.abspath(__file__), "client", str(args.requests),
+                                       str(args.warmup)], cwd=directory, env=env, capture_output=True, text=True)
+                if proc.returncode:
+                    sys.exit(proc.stderr)
+                found += json.loads(proc.stdout.strip().splitlines()[-1])
+            if "server" in args.target:
+                make_fixtures(directory, tasks, args.store)  # undo the client run's writes
+                found += bench_server(directory, env, args.requests, args.warmup, args.workers, args.concurrency)
+            for row in found:
+                row.update(tasks=tasks, store=args.store)
+            rows += found
+    finally:
+        if args.keep:
+            print(f"fixtures kept in {scratch}", file=sys.stderr)
+        else:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+    report = {
+        "meta": {"commit": git_commit(), "time": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+                 "platform": platform.platform(), "cpus": os.cpu_count(), "args": vars(args)},
+        "results": rows,
+    }
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+    print_rows(rows, baseline)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["serve"]:
+        serve(sys.argv[2], int(sys.argv[3]), int(sys.argv[4]))
+    elif sys.argv[1:2] == ["client"]:
+        apps = {name: importlib.import_module(name).create_app() for name in dict.fromkeys(app for app, *_ in SCENARIOS)}
+        print(json.dumps(bench_client(apps, int(sys.argv[2]), int(sys.argv[3]))))
+    else:
+        main()
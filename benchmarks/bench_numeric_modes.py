@@ -0,0 +1,78 @@
+"""Per-mode throughput of the calculator's numeric paths.
+
+    python benchmarks/bench_numeric_modes.py [--seconds 0.5] [--digits 28 100] [--json]
+
+Runs the basic, scientific and expression paths in float, decimal (at each
+--digits precision) and fraction mode and reports operations per second.
+The float rows are the fast path the other modes are compared against.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("CALC_POOL_WORKERS", "0")  # measure the inline path only
+
+from flask import session
+
+from calculator_app import app, basic_operations, current_mode, scientific_operations, evaluate_expression
+
+EXPRESSIONS = ["1+2*3", "0.1+0.2", "(3.5**2 - 1)/7 % 3", "sqrt(2)*pi", "factorial(20)/3"]
+
+def throughput(fn, seconds):
+    fn()  # warm caches before timing
+    count = 0
+    start = time.perf_counter()
+    deadline = start + seconds
+    while True:
+        for _ in range(100):
+            fn()
+        count += 100
+        now = time.perf_counter()
+        if now >= deadline:
+            return count / (now - start)
+
+def app_mode(name, digits=None):
+    # The mode object a request gets from its session, so the fast paths
+    # measured here are the ones the app actually takes
+    with app.test_request_context():
+        session['mode'], session['digits'] = name, digits
+        return current_mode()
+
+def bench_mode(mode, seconds):
+    a, b = mode.parse("1.1"), mode.parse("3.3")
+    cases = {
+        "basic +": lambda: basic_operations(a, b, '+', mode),
+        "basic /": lambda: basic_operations(a, b, '/', mode),
+        "basic **": lambda: basic_operations(a, 7, '**', mode),
+        "scientific sqrt": lambda: scientific_operations(b, 'sqrt', mode),
+        "scientific sin": lambda: scientific_operations(b, 'sin', mode),
+    }
+    for expression in EXPRESSIONS:
+        cases[f"expr {expression}"] = lambda expression=expression: evaluate_expression(expression, mode)
+    return {name: throughput(fn, seconds) for name, fn in cases.items()}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=0.5, help="time spent per case")
+    parser.add_argument("--digits", type=int, nargs="+", default=[28, 100], help="decimal precisions to run")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    modes = [app_mode("float")]
+    modes += [app_mode("decimal", digits) for digits in args.digits]
+    modes.append(app_mode("fraction"))
+    results = {repr(mode): bench_mode(mode, args.seconds) for mode in modes}
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    names = list(results)
+    print(f"{'ops/s':28}" + "".join(f"{name:>14}" for name in names))
+    for case in results[names[0]]:
+        print(f"{case:28}" + "".join(f"{results[name][case]:14,.0f}" for name in names))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Bulk passphrase throughput, inline and across the process pool.
+
+    python benchmarks/bench_passphrases.py [--count 1000000] [--workers 1 2 4] [--wordlist default] [--json]
+
+The inline row is the single-core generator; each pool row runs the same
+job through ParallelEngine with that many workers (pool start-up included).
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from passphrase_engine import ParallelEngine, format_lines, generate_phrases
+from wordlist import WordList, WordLists
+
+# Stand-in for the app's built-in list; pass --wordlist for a file from PASSGEN_WORDLISTS
+BUILTIN = {"default": ["apple", "beach", "chair", "dance", "eagle", "flame", "grace", "house",
+                       "island", "jungle", "kite", "lemon", "magic", "night", "ocean", "peace"]}
+
+def run(lines):
+    start = time.perf_counter()
+    total = sum(chunk.count("\n") for chunk in lines)
+    return total / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=1_000_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, os.cpu_count() or 1])
+    parser.add_argument("--wordlist", default="default")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    lists = WordLists(builtin={name: WordList.from_words(name, words) for name, words in BUILTIN.items()})
+    word_list = lists.get(args.wordlist).cached()
+    results = {"inline": run(format_lines(generate_phrases(word_list, args.count)))}
+    for workers in dict.fromkeys(args.workers):
+        engine = ParallelEngine(builtin=BUILTIN, workers=workers)
+        try:
+            results[f"pool x{workers}"] = run(engine.stream(args.count, args.wordlist))
+        finally:
+            engine.close()
+
+    if args.json:
+        print(json.dumps({"count": args.count, "cpus": os.cpu_count(), "phrases_per_second": results}, indent=2))
+        return
+    print(f"{args.count:,} phrases on {os.cpu_count()} CPU(s)")
+    for name, rate in results.items():
+        print(f"{name:12}{rate:14,.0f} phrases/s  x{rate / results['inline']:.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import hashlib
+import math
+import mmap
+import os
+import struct
+import threading
+
+from json_store import flocked
+
+MAGIC = b"BLM1"
+HEADER = struct.Struct(">4sQIQ")  # magic, bits, hashes, items added
+
+# ======================= Bloom Filter ======================= #
+class BloomFilter:
+    """A fixed-size Bloom filter kept in a memory-mapped file.
+
+    Size and hash count are chosen once, from `capacity` and `error_rate`,
+    when the file is created; after that memory use and the cost of `add`
+    and `in` stay the same however many items have been added. There are
+    no false negatives: an item that was added is always reported present.
+    Other processes that open the same file see each other's bits; adds
+    hold a flock on `<path>.lock`, so concurrent adders never lose each
+    other's bits or count. Use `add_many` for batches: it takes the flock
+    once for all of them.
+    """
+
+    def __init__(self, path, capacity=10_000_000, error_rate=1e-6):
+        self.path = path
+        self._lock = threading.Lock()
+        self._open_lock_file()
+        with flocked(self._lock_file):
+            if not os.path.exists(path) or os.path.getsize(path) < HEADER.size:
+                bits = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+                hashes = max(1, round(bits / capacity * math.log(2)))
+                with open(path, "wb") as f:
+                    f.write(HEADER.pack(MAGIC, bits, hashes, 0))
+                    f.truncate(HEADER.size + (bits + 7) // 8)
+            self._file = open(path, "r+b")
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        magic, self.bits, self.hashes, _ = HEADER.unpack_from(self._map)
+        if magic != MAGIC or len(self._map) < HEADER.size + (self.bits + 7) // 8:
+            raise ValueError(f"{path} is not a Bloom filter file")
+
+    @property
+    def count(self):
+        return HEADER.unpack_from(self._map)[3]
+
+    def _positions(self, item):
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.bits for i in range(self.hashes)]
+
+    def __contains__(self, item):
+        mm = self._map
+        return all(mm[HEADER.size + (p >> 3)] & (1 << (p & 7)) for p in self._positions(item))
+
+    def _open_lock_file(self):
+        # Kept open for the filter's lifetime. flock belongs to the open file,
+        # which a forked child shares with its parent, so each process opens its own
+        self._lock_file = open(self.path + ".lock", "a")
+        self._lock_pid = os.getpid()
+
+    def add(self, item):
+        """Set the item's bits; returns False if it was (probably) there already."""
+        return self.add_many([item])[0]
+
+    def add_many(self, items):
+        """add() each item in turn under one flock; returns a list of add()'s results."""
+        positions = [self._positions(item) for item in items]
+        mm = self._map
+        results = []
+        # The thread lock keeps this process's threads off the flock; the
+        # flock makes the read-modify-write of each byte safe across processes
+        with self._lock:
+            if self._lock_pid != os.getpid():
+                self._open_lock_file()
+            with flocked(self._lock_file):
+                added = 0
+                for item_positions in positions:
+                    new = False
+                    for p in item_positions:
+                        offset, mask = HEADER.size + (p >> 3), 1 << (p & 7)
+                        byte = mm[offset]
+                        if not byte & mask:
+                            mm[offset] = byte | mask
+                            new = True
+                    added += new
+                    results.append(new)
+                if added:
+                    struct.pack_into(">Q", mm, HEADER.size - 8, self.count + added)
+        return results
+
+    def estimated_error_rate(self):
+        return (1 - math.exp(-self.hashes * self.count / self.bits)) ** self.hashes
+
+    def flush(self):
+        self._map.flush()
+
+    def close(self):
+        with self._lock:
+            if not self._map.closed:
+                self._map.flush()
+                self._map.close()
+                self._file.close()
+                self._lock_file.close()
@@ -1,124 +1,197 @@
-from flask import Flask, render_template_string, request, redirect, url_for, flash
+from flask import Flask, Response, render_template_string, request, redirect, url_for, flash, jsonify, session
+from array import array
+from collections import deque
+import atexit
 import math
 import os
-import json
+import sys
+import time
+from json_store import BackgroundWriter, JSONFile
+from metrics import instrument, stage
+import safe_eval
+from safe_eval import FLOAT_MODE, Evaluator, LimitExceeded, MATH_NAMES, parse_expression
+from web_cache import conditional, enable_web_cache
+
+try:
+    import numpy as np
+except ImportError:  # /api/evaluate falls back to the per-element path
+    np = None
 
 app = Flask(__name__)
 app.secret_key = 'supersecretkey'
+instrument(app, 'calculator_app')
+enable_web_cache(app)
 HISTORY_FILE = 'history.json'
+HISTORY_LIMIT = 10
+HISTORY_FLUSH_INTERVAL = float(os.environ.get('CALC_HISTORY_FLUSH', 1.0))
+history_file = history_writer = None  # set up by create_app()
 
 # ================= Helper Functions ================= #
 
 def load_history():
-    if os.path.exists(HISTORY_FILE):
-        with open(HISTORY_FILE, 'r') as f:
-            return json.load(f)
-    return []
+    return deque(history_file.read(), maxlen=HISTORY_LIMIT)
 
 def save_history(history):
-    with open(HISTORY_FILE, 'w') as f:
-        json.dump(history[-10:], f)
+    snapshot = list(history)[-HISTORY_LIMIT:]
+    history_writer.submit(lambda _: snapshot)
+
+def record_history(entry):
+    # The ring buffer is this process's view; the write-behind appends against
+    # the latest file contents, so other workers' entries are kept on disk
+    history.append(entry)
+    history_writer.submit(lambda saved: (saved + [entry])[-HISTORY_LIMIT:])
 
-history = load_history()
+history = deque(maxlen=HISTORY_LIMIT)
 
 # ================= Calculator Functions ================= #
 
-def basic_operations(num1, num2, operation):
-    operations = {
-        '+': lambda x, y: x + y,
-        '-': lambda x, y: x - y,
-        '*': lambda x, y: x * y,
-        '/': lambda x, y: x / y if y != 0 else None,
-        '**': lambda x, y: x ** y,
-        '%': lambda x, y: x % y if y != 0 else None,
-        '//': lambda x, y: x // y if y != 0 else None
-    }
-    if operation in operations:
-        result = operations[operation](num1, num2)
+def current_mode():
+    try:
+        return safe_eval.get_mode(session.get('mode', 'float'), session.get('digits'))
+    except ValueError:
+        return FLOAT_MODE
+
+# Built once at import; factorial is not listed because it goes through
+# safe_eval.call (limits, memo cache, process pool)
+BASIC_OPERATIONS = {
+    '+': lambda x, y: x + y,
+    '-': lambda x, y: x - y,
+    '*': lambda x, y: x * y,
+    '/': lambda x, y: x / y if y != 0 else None,
+    '**': lambda x, y: x ** y,
+    '%': lambda x, y: x % y if y != 0 else None,
+    '//': lambda x, y: x // y if y != 0 else None
+}
+
+SCIENTIFIC_OPERATIONS = {
+    'sin': math.sin,
+    'cos': math.cos,
+    'tan': math.tan,
+    'asin': math.asin,
+    'acos': math.acos,
+    'atan': math.atan,
+    'log': math.log10,
+    'ln': math.log,
+    'sqrt': math.sqrt,
+    'exp': math.exp,
+    'abs': abs,
+    'ceil': math.ceil,
+    'floor': math.floor,
+}
+
+def basic_operations(num1, num2, operation, mode=FLOAT_MODE):
+    if mode is not FLOAT_MODE:
+        if operation in ('/', '%', '//') and num2 == 0:
+            raise ZeroDivisionError("Division by zero is not allowed!")
+        return safe_eval.apply(operation, num1, num2, mode=mode)
+    if operation in BASIC_OPERATIONS:
+        result = BASIC_OPERATIONS[operation](num1, num2)
         if result is None:
             raise ZeroDivisionError("Division by zero is not allowed!")
         return result
     else:
         raise ValueError("Invalid operation")
 
-def scientific_operations(num, operation):
-    operations = {
-        'sin': math.sin,
-        'cos': math.cos,
-        'tan': math.tan,
-        'asin': math.asin,
-        'acos': math.acos,
-        'atan': math.atan,
-        'log': math.log10,
-        'ln': math.log,
-        'sqrt': math.sqrt,
-        'exp': math.exp,
-        'abs': abs,
-        'ceil': math.ceil,
-        'floor': math.floor,
-        'factorial': lambda x: math.factorial(int(x)) if x >= 0 and x == int(x) else None
-    }
-    if operation in operations:
-        result = operations[operation](num)
-        if result is None:
-            raise ValueError("Invalid input for factorial")
-        return result
+def scientific_operations(num, operation, mode=FLOAT_MODE):
+    if operation == 'factorial' or mode is not FLOAT_MODE and operation in SCIENTIFIC_OPERATIONS:
+        return safe_eval.call(operation, num, mode=mode)
+    if operation in SCIENTIFIC_OPERATIONS:
+        return SCIENTIFIC_OPERATIONS[operation](num)
     else:
         raise ValueError("Invalid scientific operation")
 
-def evaluate_expression(expression):
-    safe_dict = {
-        "__builtins__": {},
-        'sin': math.sin,
-        'cos': math.cos,
-        'tan': math.tan,
-        'asin': math.asin,
-        'acos': math.acos,
-        'atan': math.atan,
-        'log': math.log10,
-        'ln': math.log,
-        'sqrt': math.sqrt,
-        'exp': math.exp,
-        'abs': abs,
-        'ceil': math.ceil,
-        'floor': math.floor,
-        'pi': math.pi,
-        'e': math.e,
-        'pow': pow
-    }
-    return eval(expression, safe_dict)
+def evaluate_expression(expression, mode=FLOAT_MODE):
+    # Bounded AST walk instead of eval; oversized work goes to the process pool
+    return safe_eval.evaluate(expression, mode=mode)
+
+# ================= Vector Evaluation ================= #
+
+MAX_VECTOR_SIZE = int(os.environ.get('CALC_MAX_VECTOR_SIZE', 5_000_000))
+
+# NumPy counterparts of MATH_NAMES; anything missing here (factorial) runs per element
+VECTOR_NAMES = {
+    'sin': 'sin', 'cos': 'cos', 'tan': 'tan',
+    'asin': 'arcsin', 'acos': 'arccos', 'atan': 'arctan',
+    'log': 'log10', 'ln': 'log', 'sqrt': 'sqrt', 'exp': 'exp',
+    'abs': 'abs', 'ceil': 'ceil', 'floor': 'floor', 'pow': 'power',
+    'pi': 'pi', 'e': 'e',
+}
+if np is not None:
+    VECTOR_NAMES = {name: getattr(np, attr) for name, attr in VECTOR_NAMES.items()}
+
+def evaluate_vector(expression, inputs):
+    """Evaluate one expression over equal-length input arrays, parsed once.
+
+    Returns a NumPy float64 array when NumPy is available, otherwise an
+    array('d'). Elements that fail (domain errors, overflow) come back as NaN;
+    the per-element path as a whole is bounded by Limits.batch_timeout.
+    """
+    for name in inputs:
+        if not name.isidentifier() or name.startswith('_') or name in MATH_NAMES:
+            raise ValueError(f"Invalid input name: {name}")
+    parsed = parse_expression(expression)
+    unknown = parsed.names - MATH_NAMES.keys() - inputs.keys()
+    if unknown:
+        raise NameError(f"name '{min(unknown)}' is not defined")
+    lengths = {len(values) for values in inputs.values()}
+    if len(lengths) > 1:
+        raise ValueError("All input arrays must have the same length")
+    size = lengths.pop() if lengths else 1
+    if size > MAX_VECTOR_SIZE:
+        raise ValueError(f"At most {MAX_VECTOR_SIZE} values per request")
+
+    if np is not None and parsed.names <= VECTOR_NAMES.keys() | inputs.keys():
+        arrays = {name: np.asarray(values, dtype=np.float64) for name, values in inputs.items()}
+        with np.errstate(all='ignore'):
+            result = Evaluator(VECTOR_NAMES).evaluate(parsed, arrays)
+        return np.broadcast_to(np.asarray(result, dtype=np.float64), (size,))
+
+    columns = {name: [float(v) for v in values] for name, values in inputs.items()}
+    evaluator = Evaluator(MATH_NAMES)
+    deadline = time.monotonic() + evaluator.limits.batch_timeout
+    result = array('d', bytes(8 * size))
+    for i in range(size):
+        try:
+            result[i] = float(evaluator.evaluate(parsed, {name: values[i] for name, values in columns.items()}, deadline))
+        except LimitExceeded:
+            raise
+        except (ArithmeticError, ValueError, TypeError):
+            result[i] = math.nan
+    return np.asarray(result) if np is not None else result
 
 # ================= Routes ================= #
 
 @app.route('/', methods=['GET', 'POST'])
+@conditional(lambda: (tuple(history), current_mode().key))
 def home():
-    global history
     result = None
     error = None
+    mode = current_mode()
 
     if request.method == 'POST':
         form_type = request.form.get('form_type')
 
         try:
-            if form_type == 'basic':
-                num1 = float(request.form.get('num1'))
-                num2 = float(request.form.get('num2'))
-                operation = request.form.get('operation')
-                result = basic_operations(num1, num2, operation)
-                expression = f"{num1} {operation} {num2}"
-
-            elif form_type == 'scientific':
-                num = float(request.form.get('num'))
-                operation = request.form.get('operation')
-                result = scientific_operations(num, operation)
-                expression = f"{operation}({num})"
-
-            elif form_type == 'expression':
-                expression = request.form.get('expression')
-                result = evaluate_expression(expression)
-
-            history.append(f"{expression} = {result}")
-            save_history(history)
+            with stage('evaluate'):
+                if form_type == 'basic':
+                    num1 = mode.parse(request.form.get('num1'))
+                    num2 = mode.parse(request.form.get('num2'))
+                    operation = request.form.get('operation')
+                    result = basic_operations(num1, num2, operation, mode)
+                    expression = f"{num1} {operation} {num2}"
+
+                elif form_type == 'scientific':
+                    num = mode.parse(request.form.get('num'))
+                    operation = request.form.get('operation')
+                    result = scientific_operations(num, operation, mode)
+                    expression = f"{operation}({num})"
+
+                elif form_type == 'expression':
+                    expression = request.form.get('expression')
+                    result = evaluate_expression(expression, mode)
+
+            result = safe_eval.display_value(result)
+            record_history(f"{expression} = {result}")
 
         except Exception as e:
             error = str(e)
@@ -130,7 +203,7 @@ def home():
         <meta charset="UTF-8">
         <meta name="viewport" content="width=device-width, initial-scale=1.0">
         <title>Advanced Scientific Calculator</title>
-        <script src="https://cdn.tailwindcss.com"></script>
+        <script src="{{ asset_url('vendor/tailwind.js') }}"></script>
     </head>
     <body class="bg-gray-100 text-gray-800">
     <div class="container mx-auto p-4">
@@ -174,6 +247,19 @@ def home():
                     <button type="submit" class="bg-purple-500 text-white px-4 py-2 rounded">Evaluate</button>
                 </form>
             </div>
+
+            <div class="bg-white p-4 rounded shadow md:col-span-2">
+                <h2 class="text-xl font-semibold mb-2">🎯 Numeric Mode</h2>
+                <form method="POST" action="{{ url_for('set_mode') }}" class="flex flex-wrap gap-2">
+                    <select name="mode" class="border p-2 rounded">
+                        <option value="float" {{ 'selected' if mode.name == 'float' }}>Float (fast)</option>
+                        <option value="decimal" {{ 'selected' if mode.name == 'decimal' }}>Decimal</option>
+                        <option value="fraction" {{ 'selected' if mode.name == 'fraction' }}>Fraction (exact)</option>
+                    </select>
+                    <input type="number" name="digits" min="1" max="{{ max_digits }}" value="{{ mode.digits or 28 }}" class="border p-2 rounded w-32" title="Decimal digits">
+                    <button type="submit" class="bg-gray-700 text-white px-4 py-2 rounded">Apply</button>
+                </form>
+            </div>
         </div>
 
         {% if result is not none %}
@@ -219,19 +305,85 @@ def home():
     </html>
     '''
 
-    return render_template_string(template, history=history[::-1], result=result, error=error)
+    with stage('render'):
+        return render_template_string(template, history=list(reversed(history)), result=result, error=error, mode=mode,
+                                      max_digits=safe_eval.DEFAULT_LIMITS.max_digits)
+
+@app.route('/mode', methods=['POST'])
+def set_mode():
+    try:
+        mode = safe_eval.get_mode(request.form.get('mode', 'float'), request.form.get('digits') or None)
+    except ValueError as e:
+        flash(str(e), 'error')
+        return redirect(url_for('home'))
+    session['mode'], session['digits'] = mode.name, mode.digits
+    return redirect(url_for('home'))
 
 @app.route('/clear_history')
 def clear_history():
-    global history
-    history = []
+    history.clear()
     save_history(history)
     flash('History cleared successfully!', 'success')
     return redirect(url_for('home'))
 
+@app.route('/api/evaluate', methods=['POST'])
+def api_evaluate():
+    """{"expression": "sin(x)*exp(-x)", "inputs": {"x": [...]}} -> JSON list or raw float64.
+
+    Ask for binary output with ?format=binary or Accept: application/octet-stream;
+    the body is then little-endian float64 values.
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not isinstance(data.get('expression'), str):
+        return jsonify(error='Expected {"expression": ..., "inputs": {...}}'), 400
+    inputs = data.get('inputs') or {}
+    if not isinstance(inputs, dict) or not all(isinstance(v, list) for v in inputs.values()):
+        return jsonify(error='inputs must map names to arrays of numbers'), 400
+    try:
+        with stage('evaluate'):
+            result = evaluate_vector(data['expression'], inputs)
+    except (SyntaxError, NameError, ValueError, TypeError, ArithmeticError) as e:
+        return jsonify(error=str(e)), 400
+
+    binary = request.args.get('format') == 'binary' or \
+        request.accept_mimetypes.best_match(['application/json', 'application/octet-stream']) == 'application/octet-stream'
+    if binary:
+        if np is not None:
+            body = np.ascontiguousarray(result, dtype='<f8').tobytes()
+        else:
+            if sys.byteorder != 'little':
+                result.byteswap()
+            body = result.tobytes()
+        return Response(body, mimetype='application/octet-stream', headers={'X-Result-Length': str(len(result))})
+    values = result.tolist()
+    return jsonify(result=[v if math.isfinite(v) else None for v in values])
+
+@app.route('/cache_stats')
+def cache_stats():
+    info = safe_eval.cache_info()
+    lookups = info.hits + info.misses
+    return jsonify(hits=info.hits, misses=info.misses, size=info.currsize, maxsize=info.maxsize,
+                   hit_rate=round(info.hits / lookups, 4) if lookups else 0.0,
+                   factorial=safe_eval.factorial_cache.info())
+
 @app.context_processor
 def inject_constants():
     return dict(pi=math.pi, e=math.e, tau=2*math.pi, phi=(1+math.sqrt(5))/2, sqrt2=math.sqrt(2), sqrt3=math.sqrt(3))
 
+def create_app():
+    """Load the history and start its writer, then return the app; wsgi.py calls this once per worker."""
+    global history_file, history_writer, history
+    if history_writer is None:
+        history_file = JSONFile(HISTORY_FILE, default=list)
+        history_writer = BackgroundWriter(history_file, interval=HISTORY_FLUSH_INTERVAL)
+        atexit.register(history_writer.close)
+        history = load_history()
+    return app
+
+@app.before_request
+def ensure_created():
+    # `flask run` and the test client use `app` directly, so build the state on first use
+    create_app()
+
 if __name__ == '__main__':
-    app.run(debug=True)
+    create_app().run(debug=True)
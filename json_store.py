@@ -0,0 +1,246 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from metrics import stage
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None
+
+COMMIT_WINDOW = 0.005  # seconds a commit waits for more writes to share it
+FLUSH_INTERVAL = 1.0   # seconds a BackgroundWriter collects updates before writing
+
+# ======================= File Helpers ======================= #
+@contextmanager
+def flocked(lock):
+    """Hold an exclusive advisory lock on an already open file."""
+    if fcntl:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+    try:
+        yield
+    finally:
+        if fcntl:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+@contextmanager
+def file_lock(path):
+    """Advisory cross-process lock on a sidecar `<path>.lock` file."""
+    with open(path + ".lock", "a") as lock, flocked(lock):
+        yield
+
+def atomic_write_json(path, data, **dump_kwargs):
+    """Write to a temp file in the same directory, fsync, then rename over `path`."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, **dump_kwargs)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+# ======================= Shared JSON File ======================= #
+class _PendingUpdate:
+    def __init__(self, mutate):
+        self.mutate = mutate
+        self.done = False
+        self.result = None
+        self.error = None
+
+class JSONFile:
+    """A JSON document shared between threads and worker processes.
+
+    Readers get a cached copy that is only re-parsed when the file changes on
+    disk. Writers pass a `mutate(data) -> new_data` function; updates that
+    arrive within COMMIT_WINDOW of each other are applied in order under one
+    file lock and land in a single atomic write (group commit). Each update
+    sees the latest data on disk, so concurrent workers never lose writes.
+    Callers must treat the data they are given as read-only and return a new
+    value instead of modifying it in place.
+    """
+
+    def __init__(self, path, default=list, commit_window=COMMIT_WINDOW, **dump_kwargs):
+        self.path = path
+        self.default = default
+        self.commit_window = commit_window
+        self.dump_kwargs = dump_kwargs
+        self._data = None
+        self._stamp = None
+        self._read_lock = threading.Lock()
+        self._cond = threading.Condition()
+        self._queue = []
+        self._committing = False
+
+    def _file_stamp(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def read(self):
+        with self._read_lock:
+            stamp = self._file_stamp()
+            if self._data is None or stamp != self._stamp:
+                self._data = self._load()
+                self._stamp = stamp
+            return self._data
+
+    def _load(self):
+        if os.path.exists(self.path):
+            try:
+                with stage("json_load"), open(self.path, "r", encoding="utf-8") as f:
+                    return json.load(f)
+            except ValueError:
+                pass
+        return self.default()
+
+    def write(self, data):
+        return self.update(lambda _: data)
+
+    def update(self, mutate):
+        """Apply `mutate` durably and return the data as committed with it."""
+        pending = _PendingUpdate(mutate)
+        with self._cond:
+            self._queue.append(pending)
+            while self._committing and not pending.done:
+                self._cond.wait()
+            leader = not pending.done
+            if leader:
+                self._committing = True
+        if leader:
+            self._lead()
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def _lead(self):
+        # The first writer to find no commit in progress sleeps for the window,
+        # then commits everything queued so far (its own update included) and
+        # hands over to whichever waiter queued after that
+        batch = []
+        try:
+            if self.commit_window:
+                time.sleep(self.commit_window)
+            with self._cond:
+                batch, self._queue = self._queue, []
+            self._commit(batch)
+        except BaseException as e:
+            for pending in batch:
+                if pending.error is None:
+                    pending.error = e
+        finally:
+            with self._cond:
+                for pending in batch:
+                    pending.done = True
+                self._committing = False
+                self._cond.notify_all()
+
+    def _commit(self, batch):
+        with file_lock(self.path):
+            # Always re-read under the lock: the stamp that validates read()'s
+            # cache can match after another writer's change (reused inode,
+            # coarse mtime, same size), and a stale base here loses that change
+            data = self._load()
+            applied = []
+            for pending in batch:
+                try:
+                    data = pending.mutate(data)
+                    applied.append(pending)
+                except Exception as e:
+                    pending.error = e
+            if applied:
+                with stage("json_save"):
+                    atomic_write_json(self.path, data, **self.dump_kwargs)
+                with self._read_lock:
+                    self._data = data
+                    self._stamp = self._file_stamp()
+            for pending in applied:
+                pending.result = data
+
+# ======================= Write-Behind ======================= #
+class BackgroundWriter:
+    """Applies `JSONFile.update` mutations from a background thread.
+
+    `submit` only queues the mutation and returns. The thread waits
+    `interval` seconds after the first queued update (or until
+    `max_pending` updates are queued), then applies everything queued so
+    far in one write. Call `flush` to write now and `close` (e.g. from
+    atexit) to write the rest and stop the thread.
+    """
+
+    def __init__(self, file, interval=FLUSH_INTERVAL, max_pending=None):
+        self.file = file
+        self.interval = interval
+        self.max_pending = max_pending
+        self._pending = []
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()  # keeps batches in submission order
+        self._thread = None
+        self._closed = False
+
+    def submit(self, mutate):
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("BackgroundWriter is closed")
+            self._pending.append(mutate)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="json-writer", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                deadline = time.monotonic() + self.interval
+                while not self._closed and not self._full():
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                closed = self._closed
+            self.flush()
+            if closed:
+                return
+
+    def _full(self):
+        return self.max_pending is not None and len(self._pending) >= self.max_pending
+
+    def flush(self):
+        with self._write_lock:
+            with self._cond:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return
+
+            def apply(data):
+                for mutate in batch:
+                    data = mutate(data)
+                return data
+
+            try:
+                self.file.update(apply)
+            except Exception:
+                traceback.print_exc()
+
+    def close(self, timeout=5.0):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        self.flush()
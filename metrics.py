@@ -0,0 +1,175 @@
+import cProfile
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    from flask import Response, current_app, g, has_app_context, request
+except ImportError:  # json_store and the engines also run outside Flask
+    has_app_context = lambda: False
+
+# Setting METRICS_PROFILE_DIR lets a request with "X-Profile: 1" dump a cProfile file there
+PROFILE_DIR = os.environ.get("METRICS_PROFILE_DIR")
+PROFILE_HEADER = "X-Profile"
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}" if pairs else ""
+
+# ======================= Metric Types ======================= #
+class Counter:
+    def __init__(self, name, help, labelnames=()):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            for labels, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, labels)} {value}")
+        return lines
+
+class Histogram:
+    """Cumulative-bucket latency histogram, one series per label tuple."""
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self.series = {}  # labels -> [bucket counts..., sum, count]
+        self.lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self.lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            for labels, series in sorted(self.series.items()):
+                running = 0
+                for bound, count in zip(self.buckets, series):
+                    running += count
+                    lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, [('le', bound)])} {running}")
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, [('le', '+Inf')])} {series[-1]}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {series[-2]}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {series[-1]}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def counter(self, *args, **kwargs):
+        self.metrics.append(Counter(*args, **kwargs))
+        return self.metrics[-1]
+
+    def histogram(self, *args, **kwargs):
+        self.metrics.append(Histogram(*args, **kwargs))
+        return self.metrics[-1]
+
+    def render(self):
+        """Everything in Prometheus text exposition format."""
+        return "\n".join(line for metric in self.metrics for line in metric.render()) + "\n"
+
+REGISTRY = Registry()
+REQUESTS = REGISTRY.counter("http_requests_total", "Requests handled.", ("app", "route", "method", "status"))
+REQUEST_SECONDS = REGISTRY.histogram("http_request_duration_seconds", "Time to build each response.",
+                                     ("app", "route", "method"))
+STAGE_SECONDS = REGISTRY.histogram("stage_duration_seconds", "Time spent in each inner stage.", ("app", "stage"))
+PROFILES = REGISTRY.counter("profiles_written_total", "cProfile dumps written.", ("app",))
+
+# ======================= Timing Helpers ======================= #
+def _app_name():
+    return current_app.extensions.get("metrics", current_app.name) if has_app_context() else "background"
+
+@contextmanager
+def stage(name):
+    """Time a block as `name` (store_load, store_save, filter, render, evaluate, generate, ...)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, _app_name(), name)
+
+def timed_iter(iterable, name):
+    """Yield from `iterable`, recording the time spent producing items as one `name` stage."""
+    app = _app_name()
+    spent = 0.0
+    iterator = iter(iterable)
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                spent += time.perf_counter() - start
+            yield item
+    finally:
+        STAGE_SECONDS.observe(spent, app, name)
+
+# ======================= Flask Integration ======================= #
+def instrument(app, name=None, profile_dir=PROFILE_DIR):
+    """Time every request of `app`, serve GET /metrics and honour X-Profile when enabled.
+
+    `name` is the app label on every series (defaults to app.name, which is
+    "__main__" when the module is run directly).
+
+    Streamed bodies are produced after the response is returned, so their
+    time shows up in the stage that wraps the stream, not in the route's
+    latency or its profile.
+    """
+    name = name or app.name
+    app.extensions["metrics"] = name
+
+    @app.before_request
+    def _start_timer():
+        g._metrics_start = time.perf_counter()
+        if profile_dir and request.headers.get(PROFILE_HEADER) == "1":
+            g._profiler = cProfile.Profile()
+            g._profiler.enable()
+
+    @app.after_request
+    def _record(response):
+        start = g.pop("_metrics_start", None)
+        if start is None:
+            return response
+        route = request.url_rule.rule if request.url_rule else "<unmatched>"
+        REQUEST_SECONDS.observe(time.perf_counter() - start, name, route, request.method)
+        REQUESTS.inc(name, route, request.method, str(response.status_code))
+        profiler = g.pop("_profiler", None)
+        if profiler is not None:
+            profiler.disable()
+            os.makedirs(profile_dir, exist_ok=True)
+            slug = re.sub(r"[^A-Za-z0-9]+", "_", route).strip("_") or "root"
+            path = os.path.join(profile_dir, f"{name}-{slug}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{id(profiler):x}.prof")
+            profiler.dump_stats(path)
+            PROFILES.inc(name)
+            response.headers["X-Profile-File"] = os.path.basename(path)
+        return response
+
+    @app.route("/metrics")
+    def metrics():
+        return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4")
+
+    return app
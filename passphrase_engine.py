@@ -0,0 +1,165 @@
+import json
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from wordlist import WORDLIST_DIR, WordList, WordLists
+
+SYMBOLS = "!@#$%^&*"
+BULK_BATCH = 1024  # phrases per block of randomness and per streamed chunk
+ENGINE_WORKERS = int(os.environ.get("PASSGEN_WORKERS", os.cpu_count() or 1))
+PARALLEL_MIN_COUNT = 50_000  # smaller jobs are cheaper to run inline
+CHUNK_SIZE = 16_384          # phrases per pool task
+MAX_REPEATS = 10_000         # guarded duplicates in a row before giving up
+
+# ======================= Bulk Randomness ======================= #
+class BulkRandom:
+    """Uniform integers in [0, n) drawn from os.urandom in large blocks.
+
+    Each value is read as a 1/2/4/8-byte unsigned integer and values at or
+    above the largest multiple of n are rejected, so `v % n` has no modulo
+    bias and the output is as uniform as secrets.randbelow.
+    """
+    WIDTHS = ((1, "B"), (2, "H"), (4, "I"), (8, "Q"))
+
+    def __init__(self, block_size=64 * 1024):
+        self.block_size = block_size
+        self._block = b""
+        self._pos = 0
+
+    def _read(self, size):
+        if size > len(self._block) - self._pos:
+            self._block = self._block[self._pos:] + os.urandom(max(size, self.block_size))
+            self._pos = 0
+        chunk = self._block[self._pos:self._pos + size]
+        self._pos += size
+        return chunk
+
+    def below(self, n, count):
+        width, code = next((w, c) for w, c in self.WIDTHS if n <= 256 ** w)
+        span = 256 ** width
+        limit = span - span % n
+        out = []
+        while len(out) < count:
+            need = count - len(out)
+            # Draw enough that one pass almost always suffices
+            raw = self._read(width * (need * span // limit + 8))
+            out.extend(v % n for v in memoryview(raw).cast(code) if v < limit)
+        del out[count:]
+        return out
+
+# ======================= Phrase Generation ======================= #
+def generate_phrases(word_list, count, words=4, sep="-", capitalize=True, add_number=True, add_symbol=False,
+                     guard=None):
+    """Yield `count` passphrases: `words` picks from word_list, then optional number and symbol.
+
+    With a `guard` (see bloom.BloomFilter), phrases it has seen before are
+    dropped and replaced, so none is ever issued twice.
+    """
+    rand = BulkRandom()
+    produced = 0
+    repeats = 0  # guarded duplicates in a row
+    while produced < count:
+        size = min(BULK_BATCH, count - produced)
+        picks = rand.below(len(word_list), size * words)
+        numbers = rand.below(9000, size) if add_number else None
+        symbols = rand.below(len(SYMBOLS), size) if add_symbol else None
+        batch = []
+        for i in range(size):
+            parts = [word_list[j] for j in picks[i * words:(i + 1) * words]]
+            if capitalize:
+                parts = [w.capitalize() for w in parts]
+            if add_number:
+                parts.append(str(numbers[i] + 1000))
+            if add_symbol:
+                parts.append(SYMBOLS[symbols[i]])
+            batch.append(sep.join(parts))
+        # One guard lock per batch rather than per phrase
+        fresh = guard.add_many(batch) if guard is not None else [True] * size
+        for phrase, new in zip(batch, fresh):
+            if not new:
+                repeats += 1
+                if repeats >= MAX_REPEATS:
+                    raise ValueError("Almost every passphrase for these options was already issued; "
+                                     "use more words or a larger list")
+                continue
+            repeats = 0
+            produced += 1
+            yield phrase
+
+def format_lines(phrases, ndjson=False, extra=None):
+    """Join phrases into newline-terminated chunks of BULK_BATCH lines.
+
+    NDJSON lines are {"phrase": ..., **extra}; `extra` is the same for
+    every line, so it is serialized once.
+    """
+    tail = "".join(f", {json.dumps(k)}: {json.dumps(v)}" for k, v in (extra or {}).items()) + "}\n"
+    chunk = []
+    for phrase in phrases:
+        chunk.append('{"phrase": ' + json.dumps(phrase) + tail if ndjson else phrase + "\n")
+        if len(chunk) == BULK_BATCH:
+            yield "".join(chunk)
+            chunk = []
+    if chunk:
+        yield "".join(chunk)
+
+# ======================= Process Pool ======================= #
+_worker_lists = None
+
+def _init_worker(directory, builtin):
+    # Each worker maps the word list files itself, so their pages are shared
+    # through the OS page cache instead of being pickled over
+    global _worker_lists
+    _worker_lists = WordLists(directory, builtin={name: WordList.from_words(name, words) for name, words in builtin.items()})
+
+def _generate_chunk(count, wordlist, ndjson, extra, options):
+    word_list = _worker_lists.get(wordlist).cached()
+    return "".join(format_lines(generate_phrases(word_list, count, **options), ndjson, extra))
+
+class ParallelEngine:
+    """Splits large jobs into CHUNK_SIZE tasks for a process pool and yields them in order.
+
+    Workers draw from os.urandom, so every process reads the kernel CSPRNG
+    independently and nothing needs seeding. At most two tasks per worker
+    are in flight, which keeps memory flat however large the job is.
+    """
+
+    def __init__(self, directory=WORDLIST_DIR, builtin=None, workers=ENGINE_WORKERS, chunk_size=CHUNK_SIZE):
+        self.directory = directory
+        self.builtin = dict(builtin or {})
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None:
+                # forkserver/spawn workers start clean: no app state, no inherited threads
+                method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context(method),
+                                                 initializer=_init_worker, initargs=(self.directory, self.builtin))
+            return self._pool
+
+    def stream(self, count, wordlist="default", ndjson=False, extra=None, **options):
+        """Yield newline-terminated text chunks for `count` phrases, in order."""
+        pool = self._executor()
+        in_flight = deque()
+        try:
+            for start in range(0, count, self.chunk_size):
+                size = min(self.chunk_size, count - start)
+                in_flight.append(pool.submit(_generate_chunk, size, wordlist, ndjson, extra, options))
+                if len(in_flight) >= 2 * self.workers:
+                    yield in_flight.popleft().result()
+            while in_flight:
+                yield in_flight.popleft().result()
+        finally:
+            for future in in_flight:
+                future.cancel()
+
+    def close(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(cancel_futures=True)
+                self._pool = None
@@ -1,16 +1,53 @@
-from flask import Flask, render_template_string, request, redirect, url_for
-import secrets, json, os
+from flask import Flask, Response, render_template_string, request, redirect, url_for, jsonify, stream_with_context
+import argparse
+import atexit
+import math
+import os
+import secrets
+import sys
+from collections import deque
 from datetime import datetime
+from bloom import BloomFilter
+from json_store import BackgroundWriter, JSONFile
+from metrics import instrument, stage, timed_iter
+from passphrase_engine import PARALLEL_MIN_COUNT, SYMBOLS, ParallelEngine, format_lines, generate_phrases
+from web_cache import conditional, enable_web_cache
+from wordlist import WordList, WordLists
 
 app = Flask(__name__)
 app.secret_key = "supersecretkey"
+instrument(app, "password_generator")
+enable_web_cache(app)
+MIN_WORDS, MAX_WORDS = 2, 10
+MAX_BULK_COUNT = 1_000_000
+HISTORY_ENABLED = os.environ.get("PASSGEN_HISTORY", "1") not in ("0", "false", "off", "no")
+HISTORY_FLUSH_EVERY = int(os.environ.get("PASSGEN_HISTORY_FLUSH_EVERY", 20))          # entries
+HISTORY_FLUSH_INTERVAL = float(os.environ.get("PASSGEN_HISTORY_FLUSH_INTERVAL", 1.0))  # seconds
+# Set PASSGEN_UNIQUE_FILTER to a file path to never issue the same phrase twice
+UNIQUE_FILTER = os.environ.get("PASSGEN_UNIQUE_FILTER")
+UNIQUE_CAPACITY = int(os.environ.get("PASSGEN_UNIQUE_CAPACITY", 10_000_000))
+UNIQUE_ERROR_RATE = float(os.environ.get("PASSGEN_UNIQUE_ERROR_RATE", 1e-6))
+MAX_ATTEMPTS = 1000
+STRENGTH_LEVELS = ((40, "weak"), (60, "fair"), (80, "strong"))
+
+def strength_label(bits):
+    return next((label for limit, label in STRENGTH_LEVELS if bits < limit), "very strong")
 
 # ================= Simple Passphrase Generator ================= #
 class SimplePassGen:
-    def __init__(self):
+    def __init__(self, history=HISTORY_ENABLED, flush_every=HISTORY_FLUSH_EVERY, flush_interval=HISTORY_FLUSH_INTERVAL,
+                 unique_filter=UNIQUE_FILTER):
         self.history_file = "pass_history.json"
-        self.history = []
-        self.load_history()
+        self.history_limit = 20
+        self.history_enabled = history
+        self.store = JSONFile(self.history_file, default=list, indent=2)
+        # Writes happen behind the request: every `flush_every` entries, after
+        # `flush_interval` seconds, or at exit
+        self.writer = BackgroundWriter(self.store, interval=flush_interval, max_pending=flush_every)
+        atexit.register(self.writer.close)
+        self.history = deque(maxlen=self.history_limit)
+        if history:
+            self.load_history()
         self.word_list = [
             "apple","beach","chair","dance","eagle","flame","grace","house",
             "island","jungle","kite","lemon","magic","night","ocean","peace",
@@ -18,37 +55,88 @@ class SimplePassGen:
             "bridge","castle","dream","forest","garden","harbor","journey","knight",
             "mountain","rainbow","sunset","treasure","village","wonder","crystal","phoenix"
         ]
+        # Extra lists (e.g. the EFF large list) are *.txt files in PASSGEN_WORDLISTS
+        self.wordlists = WordLists(builtin={"default": WordList.from_words("default", self.word_list)})
+        self.engine = ParallelEngine(builtin={"default": self.word_list})
+        atexit.register(self.engine.close)
+        # Optional uniqueness guard: a Bloom filter of every phrase issued so far
+        self.guard = BloomFilter(unique_filter, UNIQUE_CAPACITY, UNIQUE_ERROR_RATE) if unique_filter else None
+        if self.guard is not None:
+            atexit.register(self.guard.close)
 
     def load_history(self):
-        if os.path.exists(self.history_file):
-            try:
-                with open(self.history_file,"r") as f:
-                    self.history = json.load(f)
-            except:
-                self.history = []
+        self.history = deque(self.store.read(), maxlen=self.history_limit)
 
     def save_history(self):
-        with open(self.history_file,"w") as f:
-            json.dump(self.history[-20:],f,indent=2)
+        snapshot = list(self.history)
+        self.writer.submit(lambda _: snapshot)
+
+    def record_history(self, entry):
+        if not self.history_enabled:
+            return
+        self.history.append(entry)
+        # Appends against the latest file contents, so other workers' entries are kept
+        limit = self.history_limit
+        self.writer.submit(lambda saved: (saved + [entry])[-limit:])
 
-    def generate_passphrase(self, words=4, sep="-", capitalize=True, add_number=True, add_symbol=False):
-        selected = [secrets.choice(self.word_list).capitalize() if capitalize else secrets.choice(self.word_list) for _ in range(words)]
-        phrase = sep.join(selected)
+    def entropy(self, words=4, wordlist="default", add_number=True, add_symbol=False):
+        """Bits of entropy of a generated phrase (the choices are uniform and independent)."""
+        bits = words * self.wordlists.get(wordlist).entropy_bits
         if add_number:
-            phrase += sep + str(secrets.randbelow(9000)+1000)
+            bits += math.log2(9000)
         if add_symbol:
-            phrase += sep + secrets.choice("!@#$%^&*")
-        self.history.append({"phrase": phrase, "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S")})
-        self.save_history()
+            bits += math.log2(len(SYMBOLS))
+        return bits
+
+    def score(self, words=4, wordlist="default", add_number=True, add_symbol=False):
+        bits = self.entropy(words, wordlist, add_number, add_symbol)
+        return {"entropy_bits": round(bits, 1), "strength": strength_label(bits)}
+
+    def generate_passphrase(self, words=4, sep="-", capitalize=True, add_number=True, add_symbol=False, wordlist="default"):
+        word_list = self.wordlists.get(wordlist)
+        for _ in range(MAX_ATTEMPTS):
+            selected = [word_list[secrets.randbelow(len(word_list))] for _ in range(words)]
+            if capitalize:
+                selected = [w.capitalize() for w in selected]
+            phrase = sep.join(selected)
+            if add_number:
+                phrase += sep + str(secrets.randbelow(9000)+1000)
+            if add_symbol:
+                phrase += sep + secrets.choice(SYMBOLS)
+            if self.guard is None or self.guard.add(phrase):
+                break
+        else:
+            raise ValueError("Almost every passphrase for these options was already issued; use more words")
+        self.record_history({"phrase": phrase, "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S")})
         return phrase
 
-generator = SimplePassGen()
+    def generate_many(self, count, words=4, sep="-", capitalize=True, add_number=True, add_symbol=False, wordlist="default"):
+        """Yield `count` passphrases built like generate_passphrase, without history writes."""
+        return generate_phrases(self.wordlists.get(wordlist).cached(), count, words, sep, capitalize, add_number, add_symbol,
+                                guard=self.guard)
+
+    def stream_lines(self, count, ndjson=False, wordlist="default", **options):
+        """Newline-terminated text chunks of `count` phrases; big jobs run on every core.
+
+        NDJSON lines carry the phrase's entropy_bits and strength. With the
+        uniqueness guard on, generation stays in this process so every phrase
+        is checked against the one filter.
+        """
+        extra = self.score(options.get("words", 4), wordlist, options.get("add_number", True), options.get("add_symbol", False))
+        if count >= PARALLEL_MIN_COUNT and self.engine.workers > 1 and self.guard is None:
+            return self.engine.stream(count, wordlist, ndjson, extra, **options)
+        return format_lines(self.generate_many(count, wordlist=wordlist, **options), ndjson, extra)
+
+generator = None  # built by create_app()
 
 # ================= Flask Routes ================= #
 @app.route("/", methods=["GET","POST"])
+@conditional(lambda: (tuple(generator.history), generator.history_enabled, generator.wordlists.names()))
 def home():
     result = None
+    score = None
     error = None
+    selected = ["default"]
     if request.method=="POST":
         try:
             words = int(request.form.get("words",4))
@@ -56,7 +144,11 @@ def home():
             capitalize = request.form.get("capitalize")=="on"
             add_number = request.form.get("add_number")=="on"
             add_symbol = request.form.get("add_symbol")=="on"
-            result = generator.generate_passphrase(words, sep, capitalize, add_number, add_symbol)
+            selected = request.form.getlist("wordlist") or ["default"]
+            wordlist = ",".join(selected)
+            with stage("generate"):
+                result = generator.generate_passphrase(words, sep, capitalize, add_number, add_symbol, wordlist)
+            score = generator.score(words, wordlist, add_number, add_symbol)
         except Exception as e:
             error = str(e)
 
@@ -67,7 +159,7 @@ def home():
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Simple Passphrase Generator</title>
-    <script src="https://cdn.tailwindcss.com"></script>
+    <script src="{{ asset_url('vendor/tailwind.js') }}"></script>
     </head>
     <body class="bg-gray-50 p-6">
     <div class="max-w-xl mx-auto">
@@ -83,6 +175,13 @@ def home():
                 <label><input type="checkbox" name="capitalize" checked> Capitalize Words</label><br>
                 <label><input type="checkbox" name="add_number" checked> Add Numbers</label><br>
                 <label><input type="checkbox" name="add_symbol"> Add Symbol (!@#$%)</label><br>
+                <label>Word Lists:
+                    <select name="wordlist" multiple class="border p-1 rounded w-full">
+                    {% for name in wordlists %}
+                        <option value="{{ name }}" {{ 'selected' if name in selected }}>{{ name }}</option>
+                    {% endfor %}
+                    </select>
+                </label>
                 <button type="submit" class="bg-blue-600 text-white px-4 py-2 rounded w-full">Generate</button>
             </form>
         </div>
@@ -91,6 +190,7 @@ def home():
         <div class="mt-4 bg-green-100 p-4 rounded shadow">
             <h2 class="font-semibold">Generated Passphrase:</h2>
             <p class="break-all text-lg">{{ result }}</p>
+            <p class="text-sm text-gray-600">Strength: {{ score.strength }} (≈ {{ score.entropy_bits }} bits of entropy)</p>
         </div>
         {% endif %}
 
@@ -100,7 +200,7 @@ def home():
             {% for entry in history[::-1] %}
                 <li>{{ entry.time }} : {{ entry.phrase }}</li>
             {% else %}
-                <li>No history yet.</li>
+                <li>{{ 'No history yet.' if history_enabled else 'History is turned off (PASSGEN_HISTORY=0).' }}</li>
             {% endfor %}
             </ul>
             <a href="{{ url_for('clear_history') }}" class="mt-2 inline-block bg-red-600 text-white px-4 py-2 rounded">Clear History</a>
@@ -112,13 +212,91 @@ def home():
     </body>
     </html>
     """
-    return render_template_string(template, result=result, history=generator.history, error=error)
+    with stage("render"):
+        return render_template_string(template, result=result, score=score, history=list(generator.history), history_enabled=generator.history_enabled, error=error,
+                                      wordlists=generator.wordlists.names(), selected=selected)
+
+def bulk_options(args):
+    """Validate count/words/sep/capitalize/number/symbol from query args."""
+    count = int(args.get("count", 1))
+    words = int(args.get("words", 4))
+    if not 1 <= count <= MAX_BULK_COUNT:
+        raise ValueError(f"count must be between 1 and {MAX_BULK_COUNT}")
+    if not MIN_WORDS <= words <= MAX_WORDS:
+        raise ValueError(f"words must be between {MIN_WORDS} and {MAX_WORDS}")
+    flag = lambda name, default: args.get(name, default) in ("1", "true", "on", "yes")
+    wordlist = args.get("wordlist", "default")
+    generator.wordlists.get(wordlist)  # unknown names are a ValueError
+    return dict(count=count, words=words, sep=args.get("sep", "-"), capitalize=flag("capitalize", "1"),
+                add_number=flag("number", "1"), add_symbol=flag("symbol", "0"), wordlist=wordlist)
+
+@app.route("/api/passphrases")
+def api_passphrases():
+    """Stream ?count=N passphrases as NDJSON, one {"phrase", "entropy_bits", "strength"} per line; not added to history."""
+    try:
+        options = bulk_options(request.args)
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+    score = generator.score(options["words"], options["wordlist"], options["add_number"], options["add_symbol"])
+    lines = timed_iter(generator.stream_lines(ndjson=True, **options), "generate")
+    return Response(stream_with_context(lines), mimetype="application/x-ndjson",
+                    headers={"X-Entropy-Bits": str(score["entropy_bits"]), "X-Strength": score["strength"],
+                             "X-Unique": "1" if generator.guard is not None else "0"})
+
+@app.route("/api/wordlists")
+def api_wordlists():
+    """Available lists with their size and bits per word (indexes each list on first call)."""
+    lists = []
+    for name in generator.wordlists.names():
+        try:
+            word_list = generator.wordlists.get(name)
+            lists.append({"name": name, "words": len(word_list), "bits_per_word": round(word_list.entropy_bits, 3)})
+        except (OSError, ValueError) as e:
+            lists.append({"name": name, "error": str(e)})
+    return jsonify(wordlists=lists)
 
 @app.route("/clear_history")
 def clear_history():
-    generator.history = []
+    generator.history.clear()
     generator.save_history()
     return redirect(url_for("home"))
 
+def bulk_cli(argv):
+    parser = argparse.ArgumentParser(prog="password_generator.py bulk",
+                                     description="Print passphrases to stdout, one per line.")
+    parser.add_argument("count", type=int)
+    parser.add_argument("--words", type=int, default=4)
+    parser.add_argument("--sep", default="-")
+    parser.add_argument("--no-capitalize", dest="capitalize", action="store_false")
+    parser.add_argument("--no-number", dest="number", action="store_false")
+    parser.add_argument("--symbol", action="store_true")
+    parser.add_argument("--wordlist", default="default", help="list name, or several joined with ','")
+    parser.add_argument("--ndjson", action="store_true", help="write {\"phrase\": ...} lines instead of plain text")
+    args = parser.parse_args(argv)
+    try:
+        options = bulk_options({"count": args.count, "words": args.words, "sep": args.sep,
+                                "capitalize": "1" if args.capitalize else "0",
+                                "number": "1" if args.number else "0", "symbol": "1" if args.symbol else "0",
+                                "wordlist": args.wordlist})
+    except ValueError as e:
+        parser.error(str(e))
+    sys.stdout.writelines(generator.stream_lines(ndjson=args.ndjson, **options))
+
+def create_app():
+    """Build the generator (history, word lists, pool, guard) and return the app; wsgi.py calls this once per worker."""
+    global generator
+    if generator is None:
+        generator = SimplePassGen()
+    return app
+
+@app.before_request
+def ensure_created():
+    # `flask run` and the test client use `app` directly, so build the state on first use
+    create_app()
+
 if __name__=="__main__":
-    app.run(debug=True)
+    create_app()
+    if len(sys.argv) > 1 and sys.argv[1] == "bulk":
+        bulk_cli(sys.argv[2:])
+    else:
+        app.run(debug=True)
@@ -0,0 +1,565 @@
+import ast
+import decimal
+import math
+import operator
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from decimal import Decimal
+from fractions import Fraction
+from functools import lru_cache
+
+EXPRESSION_CACHE_SIZE = int(os.environ.get("CALC_EXPR_CACHE_SIZE", 1024))
+POOL_WORKERS = int(os.environ.get("CALC_POOL_WORKERS", 2))
+FACTORIAL_TABLE_SIZE = int(os.environ.get("CALC_FACTORIAL_TABLE", 1000))  # 0 disables the table
+FACTORIAL_CACHE_BYTES = int(os.environ.get("CALC_FACTORIAL_CACHE_BYTES", 32 * 1024 * 1024))
+LOG10_2 = math.log10(2)
+
+class LimitExceeded(ValueError):
+    """The expression would take more time or memory than its limits allow."""
+
+# ======================= Limits ======================= #
+class Limits:
+    def __init__(self, max_length=1000, max_nodes=200, max_exponent=10_000, max_int_bits=64_000,
+                 max_factorial=3_000, max_digits=1_000, timeout=0.5, batch_timeout=10.0):
+        self.max_length = max_length        # characters of expression text
+        self.max_nodes = max_nodes          # AST nodes
+        self.max_exponent = max_exponent    # |y| in integer x ** y
+        self.max_int_bits = max_int_bits    # bit length of any integer intermediate
+        self.max_factorial = max_factorial  # largest n for factorial(n)
+        self.max_digits = max_digits        # Decimal precision
+        self.timeout = timeout              # seconds per evaluation
+        self.batch_timeout = batch_timeout  # seconds for a whole per-element batch
+
+# Inline limits keep a request thread responsive; the heavy ones apply to
+# jobs that were handed to the process pool instead
+DEFAULT_LIMITS = Limits()
+HEAVY_LIMITS = Limits(max_length=10_000, max_nodes=2_000, max_exponent=1_000_000, max_int_bits=20_000_000,
+                      max_factorial=200_000, max_digits=100_000, timeout=10.0, batch_timeout=30.0)
+
+# ======================= Memo Cache ======================= #
+class SizedCache:
+    """LRU cache bounded by the total size of its values rather than their count.
+
+    Values bigger than the whole budget are not cached at all, so one huge
+    result cannot flush everything else.
+    """
+
+    def __init__(self, max_bytes, sizeof=sys.getsizeof):
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()  # key -> (value, size)
+        self._lock = threading.Lock()
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def put(self, key, value):
+        size = self.sizeof(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            self._data[key] = (value, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, (_, evicted) = self._data.popitem(last=False)
+                self.bytes -= evicted
+
+    def info(self):
+        return dict(hits=self.hits, misses=self.misses, entries=len(self._data), bytes=self.bytes,
+                    max_bytes=self.max_bytes)
+
+# ======================= Function Table ======================= #
+def _factorial_table(size):
+    table = [1]
+    for n in range(1, size + 1):
+        table.append(table[-1] * n)
+    return table
+
+FACTORIAL_TABLE = _factorial_table(FACTORIAL_TABLE_SIZE) if FACTORIAL_TABLE_SIZE else []
+factorial_cache = SizedCache(FACTORIAL_CACHE_BYTES)
+
+def factorial(x):
+    if x < 0 or x != int(x):
+        raise ValueError("Invalid input for factorial")
+    n = int(x)
+    if n < len(FACTORIAL_TABLE):
+        return FACTORIAL_TABLE[n]
+    result = factorial_cache.get(n)
+    if result is None:
+        result = math.factorial(n)
+        factorial_cache.put(n, result)
+    return result
+
+MATH_NAMES = {
+    'sin': math.sin,
+    'cos': math.cos,
+    'tan': math.tan,
+    'asin': math.asin,
+    'acos': math.acos,
+    'atan': math.atan,
+    'log': math.log10,
+    'ln': math.log,
+    'sqrt': math.sqrt,
+    'exp': math.exp,
+    'abs': abs,
+    'ceil': math.ceil,
+    'floor': math.floor,
+    'pi': math.pi,
+    'e': math.e,
+    'pow': pow,
+    'factorial': factorial,
+}
+
+BIN_OPS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: operator.pow,
+}
+UNARY_OPS = {
+    ast.UAdd: operator.pos,
+    ast.USub: operator.neg,
+}
+SYMBOL_OPS = {
+    '+': ast.Add, '-': ast.Sub, '*': ast.Mult, '/': ast.Div,
+    '//': ast.FloorDiv, '%': ast.Mod, '**': ast.Pow,
+}
+EXACT_TYPES = frozenset((int, Fraction))
+
+def _exact_bits(value):
+    if type(value) is int:
+        return value.bit_length()
+    return max(value.numerator.bit_length(), value.denominator.bit_length())
+
+# ======================= Numeric Modes ======================= #
+DEFAULT_DIGITS = 28
+MAX_FRACTION_EXPONENT = 4_000  # 1e4000 as a Fraction is already a 13k-bit integer
+
+def _decimal_pi():
+    # Series from the decimal module docs, at the current context precision
+    decimal.getcontext().prec += 2
+    three = Decimal(3)
+    lasts, t, s, n, na, d, da = 0, three, 3, 1, 0, 0, 24
+    while s != lasts:
+        lasts = s
+        n, na = n + na, na + 8
+        d, da = d + da, da + 32
+        t = (t * n) / d
+        s += t
+    decimal.getcontext().prec -= 2
+    return +s
+
+@lru_cache(maxsize=1)
+def _decimal_constants():
+    # pi and e once per process at the highest precision a mode may use;
+    # each mode rounds them to its own digits
+    with decimal.localcontext(decimal.Context(prec=DEFAULT_LIMITS.max_digits + 2)):
+        return _decimal_pi(), Decimal(1).exp()
+
+def _via_float(function):
+    # Through repr, so only the ~17 digits a float carries are shown, not its
+    # exact binary expansion; unary plus rounds to lower precisions
+    return lambda x: +Decimal(repr(function(float(x))))
+
+def _decimal_names():
+    names = {name: _via_float(value) if callable(value) else value for name, value in MATH_NAMES.items()}
+    names.update({
+        'sqrt': lambda x: Decimal(x).sqrt(),
+        'exp': lambda x: Decimal(x).exp(),
+        'ln': lambda x: Decimal(x).ln(),
+        'log': lambda x: Decimal(x).log10(),
+        'abs': abs,
+        'ceil': math.ceil,
+        'floor': math.floor,
+        'pow': pow,
+        'factorial': factorial,
+        'pi': +_decimal_constants()[0],
+        'e': +_decimal_constants()[1],
+    })
+    return names
+
+class NumericMode:
+    """How numbers are represented: 'float', 'decimal' (at `digits`) or 'fraction'.
+
+    Integers stay ints in every mode. Float literals and form inputs are read
+    from their text as Decimal or Fraction, so 0.1 + 0.2 is exactly 0.3.
+    Functions without an exact form (sin, ...) go through float; in decimal
+    mode their results are converted back so they mix with other values.
+    """
+
+    def __init__(self, name='float', digits=None):
+        self.name = name
+        self.digits = digits if name == 'decimal' else None
+        self.context = None
+        if name == 'float':
+            self.type = float
+            self.names = MATH_NAMES
+        elif name == 'fraction':
+            self.type = Fraction
+            self.names = MATH_NAMES
+        else:
+            self.type = Decimal
+            self.context = decimal.Context(prec=digits, traps=[decimal.InvalidOperation, decimal.DivisionByZero,
+                                                                decimal.Overflow])
+            with decimal.localcontext(self.context):
+                self.names = _decimal_names()
+
+    @property
+    def key(self):
+        return (self.name, self.digits)
+
+    def parse(self, text):
+        """Read a form value in this mode ('1/3' is accepted in fraction mode)."""
+        text = text.strip()
+        try:
+            if self.type is Fraction and '/' in text:
+                return Fraction(text)
+            return self.convert(text)
+        except LimitExceeded:
+            raise
+        except (ValueError, ArithmeticError):
+            raise ValueError(f"Invalid number: {text!r}") from None
+
+    def convert(self, text):
+        if self.type is float:
+            return float(text)
+        value = Decimal(text)
+        if self.type is Decimal:
+            return +value if value.is_finite() else value
+        if abs(value.adjusted()) > MAX_FRACTION_EXPONENT:
+            raise LimitExceeded(f"Exponent is limited to {MAX_FRACTION_EXPONENT} in fraction mode")
+        return Fraction(value)
+
+    def literal(self, node):
+        if type(node.value) is int:
+            return node.value
+        return self.convert(node.text)
+
+    def __repr__(self):
+        return f"{self.name}:{self.digits}" if self.digits else self.name
+
+def get_mode(name='float', digits=None):
+    """The shared NumericMode for these settings; the same arguments spelled differently give the same object."""
+    if name not in ('float', 'decimal', 'fraction'):
+        raise ValueError(f"Unknown numeric mode: {name}")
+    if name == 'decimal':
+        digits = int(digits or DEFAULT_DIGITS)
+        if not 1 <= digits <= DEFAULT_LIMITS.max_digits:
+            raise ValueError(f"Precision must be between 1 and {DEFAULT_LIMITS.max_digits} digits")
+    else:
+        digits = None  # so ('float', None) from a session is FLOAT_MODE, and its fast paths apply
+    return _cached_mode(name, digits)
+
+@lru_cache(maxsize=64)
+def _cached_mode(name, digits):
+    return NumericMode(name, digits)
+
+FLOAT_MODE = get_mode('float')
+
+# ======================= Parsing ======================= #
+def normalize_expression(expression):
+    return ' '.join(expression.split())
+
+class ParsedExpression:
+    def __init__(self, body, names, node_count):
+        self.body = body
+        self.names = names
+        self.node_count = node_count
+
+@lru_cache(maxsize=EXPRESSION_CACHE_SIZE)
+def _parse_normalized(expression):
+    tree = ast.parse(expression, mode='eval')
+    names = set()
+    node_count = 0
+    for node in ast.walk(tree):
+        node_count += 1
+        if isinstance(node, ast.BinOp) and type(node.op) not in BIN_OPS or \
+                isinstance(node, ast.UnaryOp) and type(node.op) not in UNARY_OPS:
+            raise ValueError(f"Unsupported operator: {type(node.op).__name__}")
+        if not isinstance(node, (ast.Expression, ast.BinOp, ast.UnaryOp, ast.Call, ast.Name, ast.Load,
+                                 ast.Constant, ast.operator, ast.unaryop)):
+            raise ValueError(f"Unsupported syntax: {type(node).__name__}")
+        if isinstance(node, ast.Constant):
+            if type(node.value) not in (int, float):
+                raise ValueError(f"Unsupported constant: {node.value!r}")
+            node.text = ast.get_source_segment(expression, node)  # exact modes read the literal as written
+        if isinstance(node, ast.Name):
+            if node.id.startswith('_'):
+                raise NameError(f"name '{node.id}' is not defined")
+            names.add(node.id)
+        if isinstance(node, ast.Call) and (not isinstance(node.func, ast.Name) or node.keywords):
+            raise ValueError("Only plain calls like sqrt(2) are supported")
+    return ParsedExpression(tree.body, frozenset(names), node_count)
+
+def cache_info():
+    return _parse_normalized.cache_info()
+
+def parse_expression(expression, limits=DEFAULT_LIMITS):
+    """Parse and validate once per distinct expression text (LRU cached)."""
+    if len(expression) > limits.max_length:
+        raise LimitExceeded(f"Expression is longer than {limits.max_length} characters")
+    parsed = _parse_normalized(normalize_expression(expression))
+    if parsed.node_count > limits.max_nodes:
+        raise LimitExceeded(f"Expression has more than {limits.max_nodes} parts")
+    return parsed
+
+# ======================= Evaluation ======================= #
+class Evaluator:
+    """Walks a parsed expression, enforcing Limits before each expensive step."""
+
+    def __init__(self, names=None, limits=DEFAULT_LIMITS, mode=FLOAT_MODE):
+        self.mode = mode
+        self.names = mode.names if names is None else names
+        self.limits = limits
+        self.literal = None if mode.name == 'float' else mode.literal
+        if mode.digits and mode.digits > limits.max_digits:
+            raise LimitExceeded(f"Precision is limited to {limits.max_digits} digits")
+
+    def evaluate_expression(self, expression, variables=None):
+        return self.evaluate(parse_expression(expression, self.limits), variables)
+
+    def evaluate(self, parsed, variables=None, deadline=None):
+        env = self.names
+        if variables:
+            env = dict(self.names)
+            env.update(variables)
+        unknown = parsed.names - env.keys()
+        if unknown:
+            raise NameError(f"name '{min(unknown)}' is not defined")
+        if deadline is None:
+            deadline = time.monotonic() + self.limits.timeout
+        try:
+            if self.mode.context is None:
+                return self._eval(parsed.body, env, deadline)
+            with self._decimal_context():
+                return self._eval(parsed.body, env, deadline)
+        except RecursionError:
+            # HEAVY_LIMITS allow more nodes than the interpreter's stack has frames for chains like ----1
+            raise LimitExceeded("Expression is nested too deeply") from None
+
+    def call(self, name, *args):
+        self._check_call(name, args)
+        if self.mode.context is None:
+            return self.names[name](*args)
+        with self._decimal_context():
+            return self.names[name](*args)
+
+    def apply(self, symbol, left, right):
+        """One binary operation given by its symbol ('+', '**', ...)."""
+        op = SYMBOL_OPS.get(symbol)
+        if op is None:
+            raise ValueError("Invalid operation")
+        if self.literal is not None:
+            left = self._exact_operand(op, left, right)
+        self._check_binop(op, left, right)
+        if self.mode.context is None:
+            return BIN_OPS[op](left, right)
+        with self._decimal_context():
+            return BIN_OPS[op](left, right)
+
+    @contextmanager
+    def _decimal_context(self):
+        # Report decimal signals the way the float path reports the same problems
+        try:
+            with decimal.localcontext(self.mode.context):
+                yield
+        except decimal.DivisionByZero:
+            raise ZeroDivisionError("division by zero") from None
+        except decimal.Overflow:
+            raise OverflowError("Result too large") from None
+        except decimal.InvalidOperation:
+            raise ValueError("math domain error") from None
+
+    def _exact_operand(self, op, left, right):
+        # int / int and int ** -n would give a float; keep them in the mode's type
+        if type(left) is int and type(right) is int and (op is ast.Div or op is ast.Pow and right < 0):
+            return self.mode.type(left)
+        return left
+
+    def _eval(self, node, env, deadline):
+        if time.monotonic() > deadline:
+            raise LimitExceeded("Expression took too long to evaluate")
+        if isinstance(node, ast.Constant):
+            return node.value if self.literal is None else self.literal(node)
+        if isinstance(node, ast.Name):
+            return env[node.id]
+        if isinstance(node, ast.BinOp):
+            left = self._eval(node.left, env, deadline)
+            right = self._eval(node.right, env, deadline)
+            if self.literal is not None:
+                left = self._exact_operand(type(node.op), left, right)
+            self._check_binop(type(node.op), left, right)
+            return BIN_OPS[type(node.op)](left, right)
+        if isinstance(node, ast.UnaryOp):
+            return UNARY_OPS[type(node.op)](self._eval(node.operand, env, deadline))
+        if isinstance(node, ast.Call):
+            args = [self._eval(arg, env, deadline) for arg in node.args]
+            self._check_call(node.func.id, args)
+            return env[node.func.id](*args)
+        raise ValueError(f"Unsupported syntax: {type(node).__name__}")
+
+    def _check_binop(self, op, left, right):
+        if type(left) not in EXACT_TYPES or type(right) not in EXACT_TYPES:
+            return  # floats and Decimals overflow to an error on their own; arrays are bounded by their size
+        if op is ast.Pow:
+            self._check_power(left, right)
+        elif (op is ast.Mult or type(left) is Fraction or type(right) is Fraction) and \
+                _exact_bits(left) + _exact_bits(right) > self.limits.max_int_bits:
+            raise LimitExceeded(f"Result would exceed {self.limits.max_int_bits} bits")
+
+    def _check_power(self, base, exponent):
+        if type(exponent) is Fraction:
+            if exponent.denominator != 1:
+                return  # the result is a float
+            exponent = exponent.numerator
+        if base in (0, 1, -1):
+            return
+        if abs(exponent) > self.limits.max_exponent:
+            raise LimitExceeded(f"Exponent {exponent} is larger than {self.limits.max_exponent}")
+        if (exponent > 0 or type(base) is Fraction) and _exact_bits(base) * abs(exponent) > self.limits.max_int_bits:
+            raise LimitExceeded(f"Result would exceed {self.limits.max_int_bits} bits")
+
+    def _check_call(self, name, args):
+        if name == 'factorial' and args and isinstance(args[0], (int, float, Decimal, Fraction)) and \
+                args[0] > self.limits.max_factorial and args[0] not in factorial_cache:
+            raise LimitExceeded(f"factorial is limited to n <= {self.limits.max_factorial}")
+        if name == 'pow' and len(args) == 2 and type(args[0]) in EXACT_TYPES and type(args[1]) in EXACT_TYPES:
+            self._check_power(args[0], args[1])
+
+def display_value(value, max_digits=4000):
+    """Integers too long to print (or to str() at all) are shown as 1.234e+5678."""
+    if type(value) is Fraction and _exact_bits(value) * LOG10_2 >= max_digits:
+        return f"{display_value(value.numerator)}/{display_value(value.denominator)}"
+    if type(value) is not int or value.bit_length() * LOG10_2 < max_digits:
+        return value
+    shift = value.bit_length() - 53
+    exponent10 = math.log10(abs(value) >> shift) + shift * LOG10_2
+    sign = '-' if value < 0 else ''
+    return f"{sign}{10 ** (exponent10 % 1):.15f}e+{int(exponent10)}"
+
+# ======================= Process Pool ======================= #
+_pool = None
+_pool_lock = threading.Lock()
+
+def _heavy_job(job):
+    # Runs in a worker process
+    kind, mode_key, payload = job
+    evaluator = Evaluator(limits=HEAVY_LIMITS, mode=get_mode(*mode_key))
+    if kind == 'call':
+        return evaluator.call(payload[0], *payload[1:])
+    if kind == 'apply':
+        return evaluator.apply(*payload)
+    return evaluator.evaluate_expression(payload)
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=POOL_WORKERS)
+        return _pool
+
+def _kill_pool(pool):
+    """Replace `pool` and terminate its workers; cancel() cannot stop a job that has started."""
+    global _pool
+    with _pool_lock:
+        if _pool is not pool:
+            return  # another timeout got here first
+        _pool = None
+    # ProcessPoolExecutor has no public way to stop a running job; without
+    # its private process table the stuck worker is only left to finish
+    processes = list((getattr(pool, "_processes", None) or {}).values())
+    pool.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        process.terminate()
+
+def run_in_pool(job, timeout=None):
+    """Run an ('expr' | 'call' | 'apply', mode.key, payload) job with HEAVY_LIMITS in the pool.
+
+    The calling thread only waits on a future, so a long factorial never holds
+    its GIL; past the timeout the caller gets LimitExceeded straight away and
+    the pool is replaced, so the stuck worker cannot hold up later jobs. Jobs
+    that shared the killed pool are run once more on the new one.
+    """
+    for attempt in (1, 2):
+        pool = _get_pool()
+        try:
+            future = pool.submit(_heavy_job, job)
+        except RuntimeError:
+            # Shut down or broken by another job's timeout since _get_pool()
+            if attempt == 2:
+                raise LimitExceeded("Calculation was interrupted") from None
+            continue
+        try:
+            return future.result(timeout=timeout or HEAVY_LIMITS.timeout)
+        except FutureTimeout:
+            _kill_pool(pool)
+            raise LimitExceeded("Calculation timed out") from None
+        except BrokenProcessPool:
+            # Only the pool failing; errors raised by the job itself propagate
+            if attempt == 2:
+                raise LimitExceeded("Calculation was interrupted") from None
+
+_evaluators = {}
+
+def _evaluator(mode):
+    # Keyed by settings, not object: a mode evicted from get_mode's cache and
+    # rebuilt reuses its evaluator, so this stays bounded by the modes there are
+    evaluator = _evaluators.get(mode.key)
+    if evaluator is None:
+        evaluator = _evaluators[mode.key] = Evaluator(mode=mode)
+    return evaluator
+
+def evaluate(expression, mode=FLOAT_MODE):
+    """Evaluate inline within DEFAULT_LIMITS, escalating to the pool when they are hit."""
+    try:
+        return _evaluator(mode).evaluate_expression(expression)
+    except LimitExceeded:
+        if not POOL_WORKERS or len(expression) > HEAVY_LIMITS.max_length:
+            raise
+    return run_in_pool(('expr', mode.key, expression))
+
+def call(name, *args, mode=FLOAT_MODE):
+    """Like evaluate(), for a single function call such as factorial(n)."""
+    try:
+        return _evaluator(mode).call(name, *args)
+    except LimitExceeded:
+        if not POOL_WORKERS:
+            raise
+    result = run_in_pool(('call', mode.key, (name,) + args))
+    if name == 'factorial':
+        factorial_cache.put(int(args[0]), result)  # the next request for it stays inline
+    return result
+
+def apply(symbol, left, right, mode=FLOAT_MODE):
+    """Like evaluate(), for one binary operation such as left ** right."""
+    try:
+        return _evaluator(mode).apply(symbol, left, right)
+    except LimitExceeded:
+        if not POOL_WORKERS:
+            raise
+    return run_in_pool(('apply', mode.key, (symbol, left, right)))
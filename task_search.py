@@ -0,0 +1,96 @@
+import bisect
+import re
+import threading
+
+TOKEN_RE = re.compile(r"\w+")
+TITLE_WEIGHT = 3
+DESCRIPTION_WEIGHT = 1
+
+def tokenize(text):
+    return TOKEN_RE.findall((text or "").lower())
+
+# ======================= Inverted Index ======================= #
+class SearchIndex:
+    """Token -> task postings over title and description, plus per-status id sets.
+
+    Query tokens match any indexed term they are a prefix of; a task has to
+    match every query token. Results are ranked by summed term weight (title
+    hits count more than description hits, exact terms more than prefixes).
+    """
+
+    def __init__(self, tasks=()):
+        self.postings = {}   # term -> {task_id: weight}
+        self.terms = []      # sorted terms, for prefix lookups
+        self.doc_terms = {}  # task_id -> terms, so a task can be removed again
+        self.by_status = {}  # status -> {task_id}
+        self.lock = threading.RLock()
+        for task in tasks:
+            self.add(task)
+
+    def add(self, task):
+        with self.lock:
+            task_id = task["id"]
+            weights = {}
+            for term in tokenize(task.get("title")):
+                weights[term] = weights.get(term, 0) + TITLE_WEIGHT
+            for term in tokenize(task.get("description")):
+                weights[term] = weights.get(term, 0) + DESCRIPTION_WEIGHT
+            for term, weight in weights.items():
+                posting = self.postings.get(term)
+                if posting is None:
+                    posting = self.postings[term] = {}
+                    bisect.insort(self.terms, term)
+                posting[task_id] = weight
+            self.doc_terms[task_id] = list(weights)
+            self.by_status.setdefault(task.get("status"), set()).add(task_id)
+
+    def remove(self, task_id):
+        with self.lock:
+            for term in self.doc_terms.pop(task_id, ()):
+                posting = self.postings[term]
+                posting.pop(task_id, None)
+                if not posting:
+                    del self.postings[term]
+                    del self.terms[bisect.bisect_left(self.terms, term)]
+            for ids in self.by_status.values():
+                ids.discard(task_id)
+
+    def replace(self, task):
+        with self.lock:
+            self.remove(task["id"])
+            self.add(task)
+
+    def _prefix_scores(self, token):
+        scores = {}
+        terms = self.terms
+        # Walk by index from the first candidate: no copy of the tail, no skipping to it
+        for idx in range(bisect.bisect_left(terms, token), len(terms)):
+            term = terms[idx]
+            if not term.startswith(token):
+                break
+            bonus = 2 if term == token else 1
+            for task_id, weight in self.postings[term].items():
+                scores[task_id] = max(scores.get(task_id, 0), weight * bonus)
+        return scores
+
+    def search(self, query, status=None):
+        """Return matching task ids, best match first."""
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        with self.lock:
+            candidates = None
+            if status:
+                candidates = set(self.by_status.get(status, ()))
+            totals = None
+            for token in sorted(set(tokens), key=len, reverse=True):
+                scores = self._prefix_scores(token)
+                matched = scores.keys() if candidates is None else scores.keys() & candidates
+                candidates = set(matched)
+                if totals is None:
+                    totals = {i: scores[i] for i in candidates}
+                else:
+                    totals = {i: totals[i] + scores[i] for i in candidates}
+                if not candidates:
+                    return []
+            return sorted(candidates, key=lambda i: (-totals[i], i))
@@ -0,0 +1,75 @@
+PRIORITIES = ("High", "Medium", "Low")
+
+# ======================= Dashboard Counters ======================= #
+class TaskStats:
+    """Dashboard aggregates kept up to date as tasks change, instead of rescanning the list."""
+
+    def __init__(self, total=0, completed=0, by_priority=None, completed_per_day=None):
+        self.clear()
+        self.total = total
+        self.completed = completed
+        for priority, counts in (by_priority or {}).items():
+            self.by_priority[priority] = dict(counts)
+        self.completed_per_day.update(completed_per_day or {})
+
+    def clear(self):
+        self.total = 0
+        self.completed = 0
+        self.by_priority = {p: {"total": 0, "completed": 0} for p in PRIORITIES}
+        self.completed_per_day = {}
+
+    @classmethod
+    def from_tasks(cls, tasks):
+        stats = cls()
+        for task in tasks:
+            stats.add(task)
+        return stats
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+    def to_dict(self):
+        return {
+            "total": self.total,
+            "completed": self.completed,
+            "by_priority": self.by_priority,
+            "completed_per_day": self.completed_per_day,
+        }
+
+    def copy(self):
+        return TaskStats.from_dict(self.to_dict())
+
+    def add(self, task, sign=1):
+        done = task.get("status") == "Completed"
+        bucket = self.by_priority.setdefault(task.get("priority") or "Medium", {"total": 0, "completed": 0})
+        self.total += sign
+        bucket["total"] += sign
+        if done:
+            self.completed += sign
+            bucket["completed"] += sign
+            day = (task.get("completed_at") or "")[:10]
+            if day:
+                count = self.completed_per_day.get(day, 0) + sign
+                if count > 0:
+                    self.completed_per_day[day] = count
+                else:
+                    self.completed_per_day.pop(day, None)
+
+    def remove(self, task):
+        self.add(task, sign=-1)
+
+    def replace(self, old, new):
+        self.remove(old)
+        self.add(new)
+
+    def summary(self):
+        pending = self.total - self.completed
+        return {
+            "total": self.total,
+            "completed": self.completed,
+            "pending": pending,
+            "completion_rate": int((self.completed / self.total) * 100) if self.total > 0 else 0,
+            "by_priority": self.by_priority,
+            "completed_per_day": dict(sorted(self.completed_per_day.items())),
+        }
@@ -0,0 +1,762 @@
+import bisect
+import json
+import os
+import sqlite3
+import sys
+import threading
+from contextlib import contextmanager
+
+from json_store import JSONFile
+from task_search import SearchIndex
+from task_stats import TaskStats
+
+TASK_FIELDS = ("id", "title", "description", "priority", "status", "created_at", "completed_at", "position")
+EDITABLE_FIELDS = ("title", "description", "priority", "status", "completed_at")
+POSITION_GAP = 1024
+
+# ======================= JSON Backend ======================= #
+class JSONTaskStore:
+    """Whole-file JSON storage, fine for small task lists.
+
+    The file goes through a shared JSONFile, so writes from several threads
+    or worker processes are locked, group-committed and atomically renamed
+    into place. Parsed tasks (sorted by position), counters and the search
+    index are derived from the document and only rebuilt when it changes on
+    disk; writes made through the store update them directly. The file holds
+    {"version": v, "next_id": n, "tasks": [...], "stats": {...}}; a bare list
+    from older versions is still accepted.
+    """
+
+    def __init__(self, path="tasks.json"):
+        self.path = path
+        self._version = 0
+        self._file = JSONFile(path, default=dict, indent=2, ensure_ascii=False)
+        self._doc = None
+        self._tasks = []
+        self._stats = TaskStats()
+        self._next_id = 1
+        self._by_id = None
+        self._index = None
+        self._lock = threading.RLock()
+
+    def _sync(self, doc):
+        # Rebuild the derived state when the document changed underneath us
+        if doc is self._doc:
+            return
+        if (self._doc is not None and isinstance(doc, dict) and "version" in doc
+                and doc["version"] == self._version):
+            # The same document re-parsed (each commit re-reads the file under
+            # its lock): keep the sorted tasks, stats and search index
+            self._doc = doc
+            return
+        data = {"tasks": doc} if isinstance(doc, list) else doc
+        tasks = list(data.get("tasks", []))
+        if any("position" not in t for t in tasks):
+            tasks = assign_positions([dict(t) for t in tasks])
+        tasks.sort(key=order_key)
+        self._tasks = tasks
+        self._stats = TaskStats.from_dict(data["stats"]) if "stats" in data else TaskStats.from_tasks(tasks)
+        self._next_id = max(data.get("next_id", 1), max((t["id"] for t in tasks), default=0) + 1)
+        self._version = data.get("version", 0)
+        self._doc = doc
+        self._by_id = None
+        self._index = None
+
+    def _cached(self):
+        with self._lock:
+            self._sync(self._file.read())
+            return self._tasks
+
+    def _lookup(self):
+        if self._by_id is None:
+            self._by_id = {t["id"]: t for t in self._tasks}
+        return self._by_id
+
+    def _mutate(self, change):
+        """Commit change() -> (tasks, stats, next_id, reindex) through the shared file.
+
+        change() runs inside the group commit against the latest document and
+        must build new lists rather than modify the current ones. reindex(index)
+        applies the change to a built search index; without it the index is
+        dropped and rebuilt on the next search.
+        """
+        def mutate(doc):
+            with self._lock:
+                self._sync(doc)
+                tasks, stats, next_id, reindex = change()
+                doc = {"version": self._version + 1, "next_id": next_id, "tasks": tasks, "stats": stats.to_dict()}
+                self._doc = doc
+                self._version += 1
+                self._tasks = tasks
+                self._stats = stats
+                self._next_id = next_id
+                self._by_id = None
+                if self._index is not None and reindex is not None:
+                    reindex(self._index)
+                else:
+                    self._index = None
+                return doc
+        self._file.update(mutate)
+
+    @property
+    def version(self):
+        with self._lock:
+            self._cached()
+            return self._version
+
+    def search(self, query, status=None):
+        with self._lock:
+            tasks = self._cached()
+            if self._index is None:
+                self._index = SearchIndex(tasks)
+            index = self._index
+        return self.get_many(index.search(query, status))
+
+    def get_many(self, task_ids):
+        with self._lock:
+            self._cached()
+            by_id = self._lookup()
+        return [by_id[i] for i in task_ids if i in by_id]
+
+    def load(self):
+        return list(self._cached())
+
+    def save(self, tasks):
+        def change():
+            replaced = [dict(t) for t in tasks]
+            next_id = self._next_id
+            for task in replaced:
+                if "id" not in task:
+                    task["id"] = next_id
+                next_id = max(next_id, task["id"] + 1)
+            return assign_positions(replaced), TaskStats.from_tasks(replaced), next_id, None
+        self._mutate(change)
+
+    def stats(self):
+        with self._lock:
+            self._cached()
+            return self._stats
+
+    def all(self, status=None):
+        tasks = self._cached()
+        if status:
+            return [t for t in tasks if t["status"] == status]
+        return list(tasks)
+
+    def iter_all(self, status=None):
+        return iter(self.all(status))
+
+    def page(self, status=None, after=None, limit=100):
+        """Keyset page of up to `limit` tasks following cursor `after`, plus the next cursor."""
+        with self._lock:
+            tasks = self._cached()
+        start = 0
+        if after is not None:
+            start = bisect.bisect_right(tasks, after, key=order_key)
+        found = []
+        for idx in range(start, len(tasks)):
+            if not status or tasks[idx]["status"] == status:
+                found.append(tasks[idx])
+                if len(found) > limit:
+                    break
+        return paginate(found, limit)
+
+    def get(self, task_id):
+        with self._lock:
+            self._cached()
+            return self._lookup().get(task_id)
+
+    def count(self, status=None):
+        stats = self.stats()
+        if status == "Completed":
+            return stats.completed
+        if status == "Pending":
+            return stats.total - stats.completed
+        if status:
+            return sum(1 for t in self._cached() if t["status"] == status)
+        return stats.total
+
+    def add(self, task):
+        added = {}
+
+        def change():
+            last = self._tasks[-1]["position"] if self._tasks else 0
+            new = added["task"] = dict(task, id=self._next_id, position=last + POSITION_GAP)
+            stats = self._stats.copy()
+            stats.add(new)
+            return self._tasks + [new], stats, self._next_id + 1, lambda index: index.add(new)
+        self._mutate(change)
+        return added["task"]
+
+    def update(self, task_id, **fields):
+        fields = {k: v for k, v in fields.items() if k in EDITABLE_FIELDS}
+        updated = {}
+
+        def change():
+            old = self._lookup().get(task_id)
+            if old is None:
+                return self._tasks, self._stats, self._next_id, lambda index: None
+            new = updated["task"] = dict(old, **fields)
+            stats = self._stats.copy()
+            stats.replace(old, new)
+            tasks = [new if t is old else t for t in self._tasks]
+            return tasks, stats, self._next_id, lambda index: index.replace(new)
+        self._mutate(change)
+        return updated.get("task")
+
+    def delete(self, task_ids):
+        task_ids = {int(i) for i in task_ids}
+        removed = {}
+
+        def change():
+            stats = self._stats.copy()
+            kept = []
+            for task in self._tasks:
+                if task["id"] in task_ids:
+                    stats.remove(task)
+                else:
+                    kept.append(task)
+            removed["count"] = len(self._tasks) - len(kept)
+
+            def reindex(index):
+                for task_id in task_ids:
+                    index.remove(task_id)
+            return kept, stats, self._next_id, reindex
+        self._mutate(change)
+        return removed["count"]
+
+    def move(self, task_id, before=None, after=None):
+        """Place one task right after `after` (or right before `before`)."""
+        check_move(task_id, before, after)
+        moved = {}
+
+        def change():
+            moving = self._lookup().get(task_id)
+            if moving is None:
+                return self._tasks, self._stats, self._next_id, lambda index: None
+            tasks = [t for t in self._tasks if t is not moving]
+            if after is not None:
+                idx = tasks.index(self._neighbour(after)) + 1
+            else:
+                idx = tasks.index(self._neighbour(before))
+            position = self._slot(tasks, idx)
+            if position is None:
+                # Ran out of room between the neighbours: spread everything out again
+                tasks = assign_positions([dict(t) for t in tasks])
+                position = self._slot(tasks, idx)
+            new = moved["task"] = dict(moving, position=position)
+            tasks.insert(idx, new)
+            return tasks, self._stats, self._next_id, lambda index: None
+        self._mutate(change)
+        return moved.get("task")
+
+    def reorder(self, order):
+        """Apply a full or partial client-side order to the listed tasks only."""
+        def change():
+            by_id = self._lookup()
+            listed = unique_ids(order, by_id)
+            positions = sorted(by_id[i]["position"] for i in listed)
+            moved = {i: dict(by_id[i], position=p) for i, p in zip(listed, positions)}
+            tasks = sorted((moved.get(t["id"], t) for t in self._tasks), key=order_key)
+            return tasks, self._stats, self._next_id, lambda index: None
+        self._mutate(change)
+
+    def apply_batch(self, create=(), update=(), delete=(), expected_version=None):
+        """Create, update and delete many tasks in one write; all or nothing."""
+        result = {}
+
+        def change():
+            if expected_version is not None and expected_version != self._version:
+                raise VersionConflict(self._version)
+            stats = self._stats.copy()
+            tasks = list(self._tasks)
+            next_id = self._next_id
+            last = tasks[-1]["position"] if tasks else 0
+            created, updated = [], []
+            for fields in create:
+                last += POSITION_GAP
+                task = dict(fields, id=next_id, position=last)
+                next_id += 1
+                tasks.append(task)
+                stats.add(task)
+                created.append(task)
+            index_of = {t["id"]: idx for idx, t in enumerate(tasks)}
+            for item in update:
+                if item["id"] not in index_of:
+                    raise KeyError(item["id"])
+                idx = index_of[item["id"]]
+                task = dict(tasks[idx], **{k: v for k, v in item.items() if k in EDITABLE_FIELDS})
+                stats.replace(tasks[idx], task)
+                tasks[idx] = task
+                updated.append(task)
+            delete_ids = {int(i) for i in delete}
+            if delete_ids:
+                kept = []
+                for task in tasks:
+                    if task["id"] in delete_ids:
+                        stats.remove(task)
+                    else:
+                        kept.append(task)
+                result["deleted"] = len(tasks) - len(kept)
+                tasks = kept
+            result.update(created=created, updated=updated, version=self._version + 1)
+
+            def reindex(index):
+                for task in created:
+                    index.add(task)
+                for task in updated:
+                    index.replace(task)
+                for task_id in delete_ids:
+                    index.remove(task_id)
+            return tasks, stats, next_id, reindex
+        self._mutate(change)
+        result.setdefault("deleted", 0)
+        return result
+
+    def _slot(self, tasks, idx):
+        return slot_between(tasks[idx - 1]["position"] if idx > 0 else None,
+                            tasks[idx]["position"] if idx < len(tasks) else None)
+
+    def _neighbour(self, task_id):
+        task = self._lookup().get(int(task_id))
+        if task is None:
+            raise KeyError(task_id)
+        return task
+
+# ======================= SQLite Backend ======================= #
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    title TEXT NOT NULL,
+    description TEXT NOT NULL DEFAULT '',
+    priority TEXT NOT NULL DEFAULT 'Medium',
+    status TEXT NOT NULL DEFAULT 'Pending',
+    created_at TEXT,
+    completed_at TEXT,
+    position INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks(status);
+CREATE INDEX IF NOT EXISTS idx_tasks_priority ON tasks(priority);
+CREATE INDEX IF NOT EXISTS idx_tasks_created_at ON tasks(created_at);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+class SQLiteTaskStore:
+    """Row-level storage in SQLite (WAL mode) for large task lists.
+
+    Dashboard counters, the id counter and a write version live in the meta
+    table and are updated in the same transaction as the rows they describe.
+    The search index is kept in memory and rebuilt when another process
+    bumps the version.
+    """
+
+    def __init__(self, path="tasks.db"):
+        self.path = path
+        self._local = threading.local()
+        self._index = None
+        self._index_version = None
+        self._index_lock = threading.Lock()
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+        if "position" not in {row["name"] for row in conn.execute("PRAGMA table_info(tasks)")}:
+            # Databases created before tasks had positions keep their old id order
+            conn.execute("ALTER TABLE tasks ADD COLUMN position INTEGER")
+            conn.execute("UPDATE tasks SET position = id * ?", (POSITION_GAP,))
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_position ON tasks(position, id)")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        # A connection opened before a fork (e.g. a preloading server) is not
+        # usable in the child, so each process opens its own
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    @contextmanager
+    def _write(self):
+        # BEGIN IMMEDIATE takes the write lock up front, so the meta rows read
+        # inside the transaction can't be changed by another process meanwhile
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            tx = _Transaction(conn, self._read_stats(conn), self._read_meta(conn, "version", 0))
+            yield tx
+            conn.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", [
+                ("stats", json.dumps(tx.stats.to_dict())),
+                ("version", str(tx.version + 1)),
+            ])
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        with self._index_lock:
+            if self._index is not None and self._index_version == tx.version and tx.reindex is not None:
+                tx.reindex(self._index)
+                self._index_version = tx.version + 1
+            else:
+                self._index = None
+
+    def _read_stats(self, conn):
+        row = conn.execute("SELECT value FROM meta WHERE key = 'stats'").fetchone()
+        if row:
+            return TaskStats.from_dict(json.loads(row[0]))
+        return TaskStats.from_tasks(dict(r) for r in conn.execute("SELECT priority, status, completed_at FROM tasks"))
+
+    def _read_meta(self, conn, key, default):
+        row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return int(row[0]) if row else default
+
+    def _next_id(self, conn):
+        next_id = self._read_meta(conn, "next_id", 1)
+        max_id = conn.execute("SELECT MAX(id) FROM tasks").fetchone()[0] or 0
+        next_id = max(next_id, max_id + 1)
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('next_id', ?)", (str(next_id + 1),))
+        return next_id
+
+    @property
+    def version(self):
+        return self._read_meta(self._conn(), "version", 0)
+
+    def load(self):
+        return self.all()
+
+    def save(self, tasks):
+        with self._write() as tx:
+            tasks = [dict(t) for t in tasks]
+            for task in tasks:
+                if "id" not in task:
+                    task["id"] = self._next_id(tx.conn)
+            tx.conn.execute("DELETE FROM tasks")
+            self._insert_many(tx.conn, assign_positions(tasks))
+            max_id = max((t["id"] for t in tasks), default=0)
+            tx.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('next_id', ?)",
+                            (str(max(self._read_meta(tx.conn, "next_id", 1), max_id + 1)),))
+            tx.stats.clear()
+            for task in tasks:
+                tx.stats.add(task)
+
+    def stats(self):
+        return self._read_stats(self._conn())
+
+    def search(self, query, status=None):
+        version = self.version
+        with self._index_lock:
+            if self._index is None or self._index_version != version:
+                rows = self._conn().execute("SELECT id, title, description, status FROM tasks")
+                self._index = SearchIndex(dict(row) for row in rows)
+                self._index_version = version
+            index = self._index
+        return self.get_many(index.search(query, status))
+
+    def all(self, status=None):
+        if status:
+            rows = self._conn().execute("SELECT * FROM tasks WHERE status = ? ORDER BY position, id", (status,))
+        else:
+            rows = self._conn().execute("SELECT * FROM tasks ORDER BY position, id")
+        return [dict(row) for row in rows]
+
+    def iter_all(self, status=None):
+        # A dedicated connection, so a long streamed read doesn't hold up this thread's writes.
+        # Only this generator uses it, one step at a time, but the steps may run on
+        # different threads (asgi.py pulls each batch of a streamed page on any I/O thread)
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        try:
+            if status:
+                rows = conn.execute("SELECT * FROM tasks WHERE status = ? ORDER BY position, id", (status,))
+            else:
+                rows = conn.execute("SELECT * FROM tasks ORDER BY position, id")
+            for row in rows:
+                yield dict(row)
+        finally:
+            conn.close()
+
+    def page(self, status=None, after=None, limit=100):
+        """Keyset page of up to `limit` tasks following cursor `after`, plus the next cursor."""
+        where, params = [], []
+        if status:
+            where.append("status = ?")
+            params.append(status)
+        if after is not None:
+            position, task_id = after
+            where.append("(position > ? OR (position = ? AND id > ?))")
+            params += [position, position, task_id]
+        query = "SELECT * FROM tasks"
+        if where:
+            query += " WHERE " + " AND ".join(where)
+        rows = self._conn().execute(query + " ORDER BY position, id LIMIT ?", (*params, limit + 1))
+        return paginate([dict(row) for row in rows], limit)
+
+    def get(self, task_id):
+        row = self._conn().execute("SELECT * FROM tasks WHERE id = ?", (task_id,)).fetchone()
+        return dict(row) if row else None
+
+    def get_many(self, task_ids):
+        task_ids = list(task_ids)
+        by_id = {}
+        for start in range(0, len(task_ids), 500):
+            chunk = task_ids[start:start + 500]
+            query = f"SELECT * FROM tasks WHERE id IN ({', '.join('?' * len(chunk))})"
+            by_id.update((row["id"], dict(row)) for row in self._conn().execute(query, chunk))
+        return [by_id[i] for i in task_ids if i in by_id]
+
+    def count(self, status=None):
+        if status:
+            return self._conn().execute("SELECT COUNT(*) FROM tasks WHERE status = ?", (status,)).fetchone()[0]
+        return self._conn().execute("SELECT COUNT(*) FROM tasks").fetchone()[0]
+
+    def add(self, task):
+        with self._write() as tx:
+            last = tx.conn.execute("SELECT MAX(position) FROM tasks").fetchone()[0] or 0
+            task = dict(task, id=self._next_id(tx.conn), position=last + POSITION_GAP)
+            self._insert_many(tx.conn, [task])
+            tx.stats.add(task)
+            tx.reindex = lambda index: index.add(task)
+        return task
+
+    def update(self, task_id, **fields):
+        fields = {k: v for k, v in fields.items() if k in EDITABLE_FIELDS}
+        with self._write() as tx:
+            old = tx.conn.execute("SELECT * FROM tasks WHERE id = ?", (task_id,)).fetchone()
+            if old is None:
+                return None
+            task = dict(dict(old), **fields)
+            if fields:
+                assignments = ", ".join(f"{k} = ?" for k in fields)
+                tx.conn.execute(f"UPDATE tasks SET {assignments} WHERE id = ?", (*fields.values(), task_id))
+                tx.stats.replace(dict(old), task)
+            tx.reindex = lambda index: index.replace(task)
+        return task
+
+    def delete(self, task_ids):
+        task_ids = {int(i) for i in task_ids}
+        deleted = 0
+        with self._write() as tx:
+            for task_id in task_ids:
+                row = tx.conn.execute("SELECT * FROM tasks WHERE id = ?", (task_id,)).fetchone()
+                if row:
+                    tx.stats.remove(dict(row))
+                    deleted += 1
+            tx.conn.executemany("DELETE FROM tasks WHERE id = ?", [(i,) for i in task_ids])
+
+            def reindex(index):
+                for task_id in task_ids:
+                    index.remove(task_id)
+            tx.reindex = reindex
+        return deleted
+
+    def move(self, task_id, before=None, after=None):
+        """Place one task right after `after` (or right before `before`)."""
+        check_move(task_id, before, after)
+        with self._write() as tx:
+            if self._position(tx.conn, task_id) is None:
+                return None
+            position = self._slot(tx.conn, task_id, before, after)
+            if position is None:
+                # Ran out of room between the neighbours: spread everything out again
+                ids = [row[0] for row in tx.conn.execute("SELECT id FROM tasks ORDER BY position, id")]
+                tx.conn.executemany("UPDATE tasks SET position = ? WHERE id = ?",
+                                    [((n + 1) * POSITION_GAP, i) for n, i in enumerate(ids)])
+                position = self._slot(tx.conn, task_id, before, after)
+            tx.conn.execute("UPDATE tasks SET position = ? WHERE id = ?", (position, task_id))
+            tx.reindex = lambda index: None
+        return self.get(task_id)
+
+    def reorder(self, order):
+        """Apply a full or partial client-side order to the listed tasks only."""
+        with self._write() as tx:
+            positions = {}
+            for i in order:
+                if str(i).isdigit() and int(i) not in positions:
+                    position = self._position(tx.conn, int(i))
+                    if position is not None:
+                        positions[int(i)] = position
+            tx.conn.executemany("UPDATE tasks SET position = ? WHERE id = ?",
+                                zip(sorted(positions.values()), positions))
+            tx.reindex = lambda index: None
+
+    def apply_batch(self, create=(), update=(), delete=(), expected_version=None):
+        """Create, update and delete many tasks in one transaction; all or nothing."""
+        with self._write() as tx:
+            if expected_version is not None and expected_version != tx.version:
+                raise VersionConflict(tx.version)
+            created, updated = [], []
+            last = tx.conn.execute("SELECT MAX(position) FROM tasks").fetchone()[0] or 0
+            for fields in create:
+                last += POSITION_GAP
+                task = dict(fields, id=self._next_id(tx.conn), position=last)
+                created.append(task)
+                tx.stats.add(task)
+            self._insert_many(tx.conn, created)
+            for item in update:
+                old = tx.conn.execute("SELECT * FROM tasks WHERE id = ?", (item["id"],)).fetchone()
+                if old is None:
+                    raise KeyError(item["id"])
+                fields = {k: v for k, v in item.items() if k in EDITABLE_FIELDS}
+                task = dict(dict(old), **fields)
+                if fields:
+                    assignments = ", ".join(f"{k} = ?" for k in fields)
+                    tx.conn.execute(f"UPDATE tasks SET {assignments} WHERE id = ?", (*fields.values(), item["id"]))
+                    tx.stats.replace(dict(old), task)
+                updated.append(task)
+            delete_ids = {int(i) for i in delete}
+            deleted = 0
+            for task_id in delete_ids:
+                row = tx.conn.execute("SELECT * FROM tasks WHERE id = ?", (task_id,)).fetchone()
+                if row:
+                    tx.stats.remove(dict(row))
+                    deleted += 1
+            tx.conn.executemany("DELETE FROM tasks WHERE id = ?", [(i,) for i in delete_ids])
+
+            def reindex(index):
+                for task in created:
+                    index.add(task)
+                for task in updated:
+                    index.replace(task)
+                for task_id in delete_ids:
+                    index.remove(task_id)
+            tx.reindex = reindex
+        return {"created": created, "updated": updated, "deleted": deleted, "version": tx.version + 1}
+
+    def import_json(self, json_path):
+        tasks = JSONTaskStore(json_path).load()
+        self.save(tasks)
+        return len(tasks)
+
+    def _position(self, conn, task_id):
+        row = conn.execute("SELECT position FROM tasks WHERE id = ?", (task_id,)).fetchone()
+        return row[0] if row else None
+
+    def _slot(self, conn, task_id, before, after):
+        if after is not None:
+            lo = self._position(conn, after)
+            if lo is None:
+                raise KeyError(after)
+            hi = conn.execute("SELECT MIN(position) FROM tasks WHERE position > ? AND id != ?", (lo, task_id)).fetchone()[0]
+        elif before is not None:
+            hi = self._position(conn, before)
+            if hi is None:
+                raise KeyError(before)
+            lo = conn.execute("SELECT MAX(position) FROM tasks WHERE position < ? AND id != ?", (hi, task_id)).fetchone()[0]
+        else:
+            raise ValueError("move needs a 'before' or 'after' task id")
+        return slot_between(lo, hi)
+
+    def _insert_many(self, conn, tasks):
+        conn.executemany(
+            f"INSERT INTO tasks ({', '.join(TASK_FIELDS)}) VALUES ({', '.join('?' * len(TASK_FIELDS))})",
+            [tuple(t.get(k) for k in TASK_FIELDS) for t in tasks],
+        )
+
+class _Transaction:
+    def __init__(self, conn, stats, version):
+        self.conn = conn
+        self.stats = stats
+        self.version = version
+        self.reindex = None
+
+class VersionConflict(Exception):
+    """The store changed since the version the caller based its batch on."""
+
+    def __init__(self, current):
+        super().__init__(f"Task list has changed (now at version {current})")
+        self.current = current
+
+# ======================= Helpers ======================= #
+def assign_positions(tasks):
+    for idx, task in enumerate(tasks, start=1):
+        task["position"] = idx * POSITION_GAP
+    return tasks
+
+def order_key(task):
+    return (task["position"], task["id"])
+
+# Page cursors are "position:id" of the last task shown. Seeking past that
+# key works even if the task has since been deleted, moved or filtered out,
+# so a page never starts over from the beginning.
+def make_cursor(position, task_id):
+    return f"{position}:{task_id}"
+
+def parse_cursor(text):
+    """"position:id" -> (position, id); None for a missing or malformed cursor."""
+    try:
+        position, task_id = text.split(":")
+        return int(position), int(task_id)
+    except (AttributeError, ValueError):
+        return None
+
+def paginate(tasks, limit):
+    # Callers fetch limit + 1 rows; the extra one only says whether there is a next page
+    if len(tasks) > limit:
+        tasks = tasks[:limit]
+        return tasks, make_cursor(*order_key(tasks[-1])) if tasks else None
+    return tasks, None
+
+def page_list(tasks, after, limit):
+    """Cursor paging over an already materialised list (e.g. search hits, best first).
+
+    Here a cursor's position is the index in `tasks` of the last task shown.
+    The page resumes after that task if it is still in the list, and
+    otherwise at that index (where its successor now is), so paging never
+    starts over.
+    """
+    start = 0
+    if after is not None:
+        index, task_id = after
+        if 0 <= index < len(tasks) and tasks[index]["id"] == task_id:
+            start = index + 1
+        else:
+            start = next((i + 1 for i, task in enumerate(tasks) if task["id"] == task_id), max(index, 0))
+    page = tasks[start:start + limit]
+    more = start + limit < len(tasks)
+    return page, make_cursor(start + len(page) - 1, page[-1]["id"]) if more and page else None
+
+def check_move(task_id, before, after):
+    # Both backends reject the same moves, before touching any data
+    anchor = after if after is not None else before
+    if anchor is None:
+        raise ValueError("move needs a 'before' or 'after' task id")
+    if int(anchor) == task_id:
+        raise ValueError(f"task {task_id} cannot be placed next to itself")
+
+def slot_between(lo, hi):
+    if lo is None and hi is None:
+        return POSITION_GAP
+    if lo is None:
+        return hi - POSITION_GAP
+    if hi is None:
+        return lo + POSITION_GAP
+    if hi - lo < 2:
+        return None
+    return (lo + hi) // 2
+
+def unique_ids(order, known):
+    ids = []
+    seen = set()
+    for i in order:
+        if str(i).isdigit() and int(i) in known and int(i) not in seen:
+            seen.add(int(i))
+            ids.append(int(i))
+    return ids
+
+def open_store(backend=None, path=None):
+    backend = backend or os.environ.get("TODO_STORE", "json")
+    if backend == "sqlite":
+        return SQLiteTaskStore(path or os.environ.get("TODO_DB", "tasks.db"))
+    if backend == "json":
+        return JSONTaskStore(path or os.environ.get("TODO_FILE", "tasks.json"))
+    raise ValueError(f"Unknown task store backend: {backend}")
+
+# Usage: python task_store.py import tasks.json tasks.db
+if __name__ == "__main__":
+    if len(sys.argv) != 4 or sys.argv[1] != "import":
+        sys.exit("usage: python task_store.py import <tasks.json> <tasks.db>")
+    imported = SQLiteTaskStore(sys.argv[3]).import_json(sys.argv[2])
+    print(f"Imported {imported} task(s) from {sys.argv[2]} into {sys.argv[3]}")
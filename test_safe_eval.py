@@ -0,0 +1,88 @@
+import pytest
+
+import safe_eval
+from safe_eval import DEFAULT_LIMITS, Evaluator, LimitExceeded, parse_expression
+
+# ======================= Rejected Syntax ======================= #
+@pytest.mark.parametrize("expression", [
+    "(1).__class__",
+    "sqrt.__globals__",
+    "lambda: 1",
+    "[1, 2]",
+    "{}",
+    "1 if 1 else 2",
+    "1 < 2",
+    "1 and 2",
+    "(x := 1)",
+    "'abc'",
+    "True",
+    "f'{1}'",
+    "sqrt(x=2)",
+    "sqrt(*[2])",
+    "await x",
+    "abs(1)(2)",
+])
+def test_unsupported_syntax_is_rejected(expression):
+    with pytest.raises((ValueError, SyntaxError)):
+        safe_eval.evaluate(expression)
+
+@pytest.mark.parametrize("expression", ["__import__('os')", "__builtins__", "_", "_x + 1", "open(1)", "eval(1)", "exec(1)"])
+def test_private_and_unknown_names_are_rejected(expression):
+    with pytest.raises(NameError):
+        safe_eval.evaluate(expression)
+
+@pytest.mark.parametrize("expression", ["import os", "del x", "x = 1", "yield 1", "global x", "1; 2"])
+def test_statements_and_keywords_are_rejected(expression):
+    with pytest.raises(SyntaxError):
+        safe_eval.evaluate(expression)
+
+def test_allowed_expressions_still_evaluate():
+    assert safe_eval.evaluate("2 + 3 * 4") == 14
+    assert safe_eval.evaluate("sqrt(16) + abs(-2)") == 6
+    assert safe_eval.evaluate("-(-1)") == 1
+
+# ======================= Limits ======================= #
+def test_huge_power_is_refused():
+    with pytest.raises(LimitExceeded):
+        safe_eval.evaluate("9**9**9")
+
+def test_huge_factorial_is_refused():
+    with pytest.raises(LimitExceeded):
+        safe_eval.evaluate("factorial(10**6)")
+    with pytest.raises(LimitExceeded):
+        safe_eval.call("factorial", 10**6)
+
+def test_node_count_limit():
+    inline = "+".join(["1"] * (DEFAULT_LIMITS.max_nodes // 2))
+    with pytest.raises(LimitExceeded):
+        parse_expression(inline)
+    with pytest.raises(LimitExceeded):
+        safe_eval.evaluate("+".join(["1"] * safe_eval.HEAVY_LIMITS.max_nodes))
+
+def test_length_limit():
+    with pytest.raises(LimitExceeded):
+        parse_expression("1" * (DEFAULT_LIMITS.max_length + 1))
+    with pytest.raises(LimitExceeded):
+        safe_eval.evaluate(" " * safe_eval.HEAVY_LIMITS.max_length + "1")
+
+def test_deep_nesting_is_refused():
+    with pytest.raises(LimitExceeded):
+        safe_eval.evaluate("-" * 990 + "1")
+
+def test_inline_limits_without_the_pool():
+    evaluator = Evaluator()
+    for expression in ("9**9**9", "factorial(10**6)", "2**64000 * 2**64000"):
+        with pytest.raises(LimitExceeded):
+            evaluator.evaluate_expression(expression)
+
+# ======================= Process Pool ======================= #
+def test_pool_timeout_replaces_the_pool():
+    key = safe_eval.FLOAT_MODE.key
+    with pytest.raises(LimitExceeded, match="timed out"):
+        safe_eval.run_in_pool(("call", key, ("factorial", 200_000)), timeout=0.01)
+    assert safe_eval._pool is None
+    assert safe_eval.run_in_pool(("call", key, ("factorial", 20))) == 2432902008176640000
+
+def test_errors_from_the_job_are_not_retried():
+    with pytest.raises(ZeroDivisionError):
+        safe_eval.run_in_pool(("expr", safe_eval.FLOAT_MODE.key, "1/0"))
@@ -1,100 +1,105 @@
-from flask import Flask, render_template_string, request, redirect, url_for, flash, jsonify
-import json
-import os
+from flask import Flask, Response, render_template, request, redirect, url_for, flash, jsonify, stream_with_context
 from datetime import datetime
+from metrics import instrument, stage, timed_iter
+from task_store import VersionConflict, open_store, page_list, parse_cursor
+from web_cache import conditional, enable_web_cache
 
 app = Flask(__name__)
 app.secret_key = "supersecretkey"
-TASKS_FILE = "tasks.json"
+instrument(app, "todo_app")
+enable_web_cache(app)
+store = None  # opened by create_app(); TODO_STORE=json|sqlite picks the backend
+PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_BUFFER = 64  # template chunks per streamed write
 
 # ======================= Helper Functions ======================= #
 def load_tasks():
-    if os.path.exists(TASKS_FILE):
-        try:
-            with open(TASKS_FILE, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except:
-            return []
-    return []
+    return store.load()
 
 def save_tasks(tasks):
-    with open(TASKS_FILE, "w", encoding="utf-8") as f:
-        json.dump(tasks, f, indent=2, ensure_ascii=False)
+    store.save(tasks)
+
+def now():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-def reassign_ids(tasks):
-    for idx, task in enumerate(tasks, start=1):
-        task["id"] = idx
-    return tasks
+def new_task(title, description="", priority="Medium"):
+    return {
+        "title": title,
+        "description": description,
+        "priority": priority,
+        "status": "Pending",
+        "created_at": now(),
+        "completed_at": None
+    }
+
+def stream_page(**context):
+    app.update_template_context(context)
+    stream = PAGE.stream(context)
+    stream.enable_buffering(STREAM_BUFFER)
+    return Response(stream_with_context(timed_iter(stream, "render")), mimetype="text/html")
 
 # ======================= Flask Routes ======================= #
 @app.route("/", methods=["GET"])
+@conditional(lambda: store.version)
 def index():
-    tasks = load_tasks()
     status_filter = request.args.get("status", "All")
     search_query = request.args.get("search", "").strip()
     
-    if status_filter != "All":
-        tasks = [t for t in tasks if t["status"]==status_filter]
-    if search_query:
-        tasks = [t for t in tasks if search_query.lower() in t["title"].lower() or search_query.lower() in t["description"].lower()]
+    status = None if status_filter == "All" else status_filter
+    with stage("store_load"):
+        stats = store.stats().summary()
+    context = dict(search_query=search_query, status_filter=status_filter, total=stats["total"],
+                   completed=stats["completed"], pending=stats["pending"],
+                   completion_rate=stats["completion_rate"])
     
-    total = len(load_tasks())
-    completed = len([t for t in load_tasks() if t["status"]=="Completed"])
-    pending = total - completed
-    completion_rate = int((completed/total)*100) if total>0 else 0
+    # ?stream=1 sends every matching row as it is rendered, for large exports
+    if request.args.get("stream"):
+        tasks = store.search(search_query, status) if search_query else store.iter_all(status)
+        return stream_page(tasks=tasks, after=None, next_after=None, limit=None, **context)
     
-    return render_template_string(TEMPLATE, tasks=tasks, search_query=search_query, 
-                                  status_filter=status_filter, total=total, completed=completed,
-                                  pending=pending, completion_rate=completion_rate)
+    after = parse_cursor(request.args.get("after"))
+    limit = min(max(request.args.get("limit", PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+    if search_query:
+        with stage("filter"):
+            tasks, next_after = page_list(store.search(search_query, status), after, limit)
+    else:
+        with stage("store_load"):
+            tasks, next_after = store.page(status, after, limit)
+    with stage("render"):
+        return render_template(PAGE, tasks=tasks, after=after, next_after=next_after, limit=limit, **context)
+
+@app.route("/stats", methods=["GET"])
+def task_stats():
+    return jsonify(store.stats().summary())
 
 @app.route("/add", methods=["POST"])
 def add_task():
-    tasks = load_tasks()
     title = request.form.get("title").strip()
     description = request.form.get("description").strip()
     priority = request.form.get("priority", "Medium")
     if not title:
         flash("Task title cannot be empty!", "danger")
         return redirect(url_for("index"))
-    task = {
-        "id": len(tasks)+1,
-        "title": title,
-        "description": description,
-        "priority": priority,
-        "status": "Pending",
-        "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "completed_at": None
-    }
-    tasks.append(task)
-    save_tasks(tasks)
+    with stage("store_save"):
+        store.add(new_task(title, description, priority))
     flash(f"Task '{title}' added successfully!", "success")
     return redirect(url_for("index"))
 
 @app.route("/update/<int:task_id>", methods=["POST"])
 def update_task(task_id):
-    tasks = load_tasks()
-    for task in tasks:
-        if task["id"] == task_id:
-            title = request.form.get(f"title_{task_id}").strip()
-            description = request.form.get(f"description_{task_id}").strip()
-            priority = request.form.get(f"priority_{task_id}", "Medium")
-            task["title"] = title
-            task["description"] = description
-            task["priority"] = priority
-            break
-    save_tasks(tasks)
+    title = request.form.get(f"title_{task_id}").strip()
+    description = request.form.get(f"description_{task_id}").strip()
+    priority = request.form.get(f"priority_{task_id}", "Medium")
+    with stage("store_save"):
+        store.update(task_id, title=title, description=description, priority=priority)
     flash(f"Task #{task_id} updated successfully!", "success")
     return redirect(url_for("index"))
 
 @app.route("/complete/<int:task_id>")
 def complete_task(task_id):
-    tasks = load_tasks()
-    for task in tasks:
-        if task["id"]==task_id:
-            task["status"]="Completed"
-            task["completed_at"]=datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            break
-    save_tasks(tasks)
+    with stage("store_save"):
+        store.update(task_id, status="Completed", completed_at=now())
     flash(f"Task #{task_id} marked as completed!", "success")
     return redirect(url_for("index"))
 
@@ -104,23 +109,91 @@ def delete_task():
     if not selected_ids:
         flash("Select at least one task to delete!", "warning")
         return redirect(url_for("index"))
-    tasks = load_tasks()
-    tasks = [t for t in tasks if str(t["id"]) not in selected_ids]
-    tasks = reassign_ids(tasks)
-    save_tasks(tasks)
+    with stage("store_save"):
+        store.delete(i for i in selected_ids if i.isdigit())
     flash(f"Deleted {len(selected_ids)} task(s) successfully!", "success")
     return redirect(url_for("index"))
 
 @app.route("/reorder", methods=["POST"])
 def reorder_tasks():
-    order = request.json.get("order", [])
-    tasks = load_tasks()
-    tasks_dict = {str(t["id"]): t for t in tasks}
-    new_tasks = [tasks_dict[str(i)] for i in order if str(i) in tasks_dict]
-    new_tasks = reassign_ids(new_tasks)
-    save_tasks(new_tasks)
+    data = request.json or {}
+    if "id" in data:
+        # Single drag: {"id": 7, "after": 3} or {"id": 7, "before": 4}
+        try:
+            with stage("store_save"):
+                task = store.move(int(data["id"]), before=data.get("before"), after=data.get("after"))
+        except (KeyError, ValueError) as e:
+            return jsonify({"status":"error", "message":f"Invalid move: {e}"}), 400
+        if task is None:
+            return jsonify({"status":"error", "message":"Task not found"}), 404
+        return jsonify({"status":"success", "task":task})
+    with stage("store_save"):
+        store.reorder(data.get("order", []))
     return jsonify({"status":"success"})
 
+# ======================= JSON API ======================= #
+def api_error(message, code):
+    return jsonify({"status":"error", "message":message}), code
+
+@app.route("/api/tasks", methods=["GET"])
+def api_list_tasks():
+    status = request.args.get("status")
+    search_query = request.args.get("search", "").strip()
+    after = parse_cursor(request.args.get("after"))
+    limit = min(max(request.args.get("limit", PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+    version = store.version
+    if search_query:
+        with stage("filter"):
+            tasks, next_after = page_list(store.search(search_query, status), after, limit)
+    else:
+        with stage("store_load"):
+            tasks, next_after = store.page(status, after, limit)
+    response = jsonify({"tasks":tasks, "next_after":next_after, "version":version})
+    response.set_etag(str(version))
+    return response
+
+@app.route("/api/tasks", methods=["POST"])
+def api_batch():
+    """Apply {"create": [...], "update": [...], "complete": [ids], "delete": [ids]} in one write.
+
+    Send the ETag from a previous response as If-Match to only apply the batch
+    if nobody changed the tasks in between (412 otherwise).
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return api_error("Expected a JSON object", 400)
+    expected_version = None
+    if request.if_match and not request.if_match.star_tag:
+        tags = request.if_match.as_set()
+        if len(tags) != 1 or not next(iter(tags)).isdigit():
+            return api_error("If-Match must be a single task list ETag", 400)
+        expected_version = int(next(iter(tags)))
+    try:
+        create = []
+        for item in data.get("create", []):
+            title = (item.get("title") or "").strip()
+            if not title:
+                return api_error("Task title cannot be empty!", 400)
+            create.append(new_task(title, (item.get("description") or "").strip(), item.get("priority", "Medium")))
+        update = [dict(item, id=int(item["id"])) for item in data.get("update", [])]
+        completed_at = now()
+        update += [{"id":int(i), "status":"Completed", "completed_at":completed_at} for i in data.get("complete", [])]
+        delete = [int(i) for i in data.get("delete", [])]
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return api_error("Malformed batch", 400)
+    try:
+        with stage("store_save"):
+            result = store.apply_batch(create, update, delete, expected_version)
+    except VersionConflict as e:
+        response = jsonify({"status":"error", "message":str(e), "version":e.current})
+        response.set_etag(str(e.current))
+        return response, 412
+    except KeyError as e:
+        return api_error(f"Task {e.args[0]} not found", 404)
+    response = jsonify(dict(result, status="success"))
+    response.set_etag(str(result["version"]))
+    return response
+
 # ======================= HTML Template ======================= #
 TEMPLATE = """
 <!DOCTYPE html>
@@ -129,7 +202,7 @@ TEMPLATE = """
 <meta charset="UTF-8">
 <meta name="viewport" content="width=device-width, initial-scale=1">
 <title>Todo Dashboard</title>
-<link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.2/dist/css/bootstrap.min.css" rel="stylesheet">
+<link href="{{ asset_url('vendor/bootstrap.min.css') }}" rel="stylesheet">
 <style>
 body {background-color:#f8f9fa;}
 .completed {text-decoration: line-through; color: gray;}
@@ -193,9 +266,9 @@ input.inline-edit {width: 100%;}
         </thead>
         <tbody id="sortable">
             {% for task in tasks %}
-            <tr class="{{ 'completed' if task.status=='Completed' }}">
+            <tr class="{{ 'completed' if task.status=='Completed' }}" data-id="{{task.id}}">
                 <td><input type="checkbox" name="task_ids" value="{{task.id}}"></td>
-                <td>{{task.id}}</td>
+                <td class="drag-handle" style="cursor:move">{{task.id}}</td>
                 <td>
                     <form method="POST" action="{{ url_for('update_task', task_id=task.id) }}">
                         <input type="text" name="title_{{task.id}}" class="inline-edit" value="{{task.title}}">
@@ -223,10 +296,18 @@ input.inline-edit {width: 100%;}
         </tbody>
     </table>
     </form>
+
+    <!-- Pagination -->
+    {% if after or next_after %}
+    <nav class="d-flex justify-content-between mb-4">
+        <a href="{{ url_for('index', status=status_filter, search=search_query or None, limit=limit) }}" class="btn btn-outline-secondary {% if not after %}disabled{% endif %}">First page</a>
+        <a href="{{ url_for('index', status=status_filter, search=search_query or None, after=next_after, limit=limit) }}" class="btn btn-outline-secondary {% if not next_after %}disabled{% endif %}">Next page</a>
+    </nav>
+    {% endif %}
 </div>
 
-<script src="https://cdn.jsdelivr.net/npm/bootstrap@5.3.2/dist/js/bootstrap.bundle.min.js"></script>
-<script src="https://cdn.jsdelivr.net/npm/sortablejs@1.15.0/Sortable.min.js"></script>
+<script src="{{ asset_url('vendor/bootstrap.bundle.min.js') }}"></script>
+<script src="{{ asset_url('vendor/Sortable.min.js') }}"></script>
 <script>
 document.getElementById("selectAll").addEventListener("change", function(){
     document.querySelectorAll('input[name="task_ids"]').forEach(cb => cb.checked = this.checked);
@@ -237,11 +318,13 @@ new Sortable(document.getElementById("sortable"), {
     animation: 150,
     handle: ".drag-handle",
     onEnd: function (evt) {
-        let order = Array.from(document.querySelectorAll("#sortable tr")).map(row => row.children[1].textContent);
+        let row = evt.item, prev = row.previousElementSibling, next = row.nextElementSibling;
+        let move = {id: row.dataset.id};
+        if (prev) move.after = prev.dataset.id; else if (next) move.before = next.dataset.id; else return;
         fetch("{{ url_for('reorder_tasks') }}", {
             method:"POST",
             headers: {"Content-Type":"application/json"},
-            body: JSON.stringify({order: order})
+            body: JSON.stringify(move)
         });
     }
 });
@@ -250,5 +333,19 @@ new Sortable(document.getElementById("sortable"), {
 </html>
 """
 
+PAGE = app.jinja_env.from_string(TEMPLATE)
+
+def create_app():
+    """Open the task store and return the app; wsgi.py calls this once per worker."""
+    global store
+    if store is None:
+        store = open_store()
+    return app
+
+@app.before_request
+def ensure_created():
+    # `flask run` and the test client use `app` directly, so build the state on first use
+    create_app()
+
 if __name__ == "__main__":
-    app.run(debug=True)
+    create_app().run(debug=True)
@@ -0,0 +1,184 @@
+import hashlib
+import os
+import sys
+import urllib.request
+import zlib
+from functools import lru_cache, wraps
+
+from flask import current_app, make_response, request, url_for
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+COMPRESS_MIN_SIZE = 1024  # smaller bodies are not worth the header and CPU
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5        # dynamic responses; fingerprinted assets use the maximum once
+COMPRESSIBLE = ("text/", "application/json", "application/javascript", "application/x-ndjson", "image/svg+xml")
+ASSET_MAX_AGE = 365 * 24 * 3600
+
+# Pinned third-party files, served from static/ once `python web_cache.py fetch`
+# has downloaded them; until then asset_url() falls back to these URLs
+VENDOR = {
+    "vendor/bootstrap.min.css": "https://cdn.jsdelivr.net/npm/bootstrap@5.3.2/dist/css/bootstrap.min.css",
+    "vendor/bootstrap.bundle.min.js": "https://cdn.jsdelivr.net/npm/bootstrap@5.3.2/dist/js/bootstrap.bundle.min.js",
+    "vendor/Sortable.min.js": "https://cdn.jsdelivr.net/npm/sortablejs@1.15.0/Sortable.min.js",
+    "vendor/tailwind.js": "https://cdn.tailwindcss.com/3.4.1",
+}
+
+def _digest(*parts, size=10):
+    h = hashlib.blake2b(digest_size=size)
+    for part in parts:
+        h.update(part if isinstance(part, bytes) else repr(part).encode())
+    return h.hexdigest()
+
+# ======================= Static Assets ======================= #
+def fingerprint_assets(folder):
+    """{relative path: content hash} for every file under `folder`."""
+    prints = {}
+    if folder and os.path.isdir(folder):
+        for root, _, files in os.walk(folder):
+            for filename in files:
+                path = os.path.join(root, filename)
+                with open(path, "rb") as f:
+                    prints[os.path.relpath(path, folder).replace(os.sep, "/")] = _digest(f.read())
+    return prints
+
+def asset_url(name):
+    """URL of a static file with its content hash as ?v=, so it can be cached forever."""
+    fingerprint = current_app.extensions["web_cache"]["assets"].get(name)
+    if fingerprint:
+        return url_for("static", filename=name, v=fingerprint)
+    return VENDOR.get(name) or url_for("static", filename=name)
+
+@lru_cache(maxsize=64)
+def _compressed_asset(path, fingerprint, encoding):
+    # Keyed by fingerprint, so each asset version is compressed once at the highest level
+    with open(path, "rb") as f:
+        data = f.read()
+    if encoding == "br":
+        return brotli.compress(data, quality=11)
+    return _gzip(data, 9)
+
+# ======================= Compression ======================= #
+def _gzip(data, level=GZIP_LEVEL):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    return compressor.compress(data) + compressor.flush()
+
+def _compressor(encoding, level=None):
+    if encoding == "br":
+        c = brotli.Compressor(quality=level or BROTLI_QUALITY)
+        return c.process, c.flush, c.finish
+    c = zlib.compressobj(level or GZIP_LEVEL, zlib.DEFLATED, 31)
+    return c.compress, lambda: c.flush(zlib.Z_SYNC_FLUSH), c.flush
+
+def _compress_stream(chunks, encoding):
+    # Flush after every chunk so streamed pages and NDJSON still arrive incrementally
+    compress, flush, finish = _compressor(encoding)
+    try:
+        for chunk in chunks:
+            data = compress(chunk.encode("utf-8") if isinstance(chunk, str) else chunk) + flush()
+            if data:
+                yield data
+        yield finish()
+    finally:
+        if hasattr(chunks, "close"):
+            chunks.close()
+
+def _choose_encoding():
+    offered = ["br", "gzip"] if brotli is not None else ["gzip"]
+    return request.accept_encodings.best_match(offered)
+
+def _compress_response(response):
+    if (response.status_code < 200 or response.status_code in (204, 206, 304)
+            or "Content-Encoding" in response.headers or not response.mimetype.startswith(COMPRESSIBLE)):
+        return response
+    etag, weak = response.get_etag()
+    if etag and not weak and request.endpoint != "static":
+        return response  # strong ETags (If-Match on /api/tasks) must stay byte-for-byte
+    encoding = _choose_encoding()
+    if encoding is None:
+        return response
+    response.vary.add("Accept-Encoding")
+    if request.endpoint == "static":
+        fingerprint = current_app.extensions["web_cache"]["assets"].get(request.view_args["filename"])
+        if fingerprint is None:
+            return response
+        path = os.path.join(current_app.static_folder, request.view_args["filename"])
+        response.direct_passthrough = False
+        response.set_data(_compressed_asset(path, fingerprint, encoding))
+        if etag:
+            response.set_etag(etag, weak=True)  # same file, different bytes per encoding
+    elif response.is_streamed:
+        response.response = _compress_stream(response.response, encoding)
+        response.headers.pop("Content-Length", None)
+    else:
+        data = response.get_data()
+        if len(data) < COMPRESS_MIN_SIZE:
+            return response
+        response.set_data(brotli.compress(data, quality=BROTLI_QUALITY) if encoding == "br" else _gzip(data))
+    response.headers["Content-Encoding"] = encoding
+    return response
+
+# ======================= Conditional GET ======================= #
+def conditional(key):
+    """Give GET responses a weak ETag built from key() and answer a matching If-None-Match with 304.
+
+    key() must cover everything the page shows and should be cheap (a store
+    version, the history contents): it runs before the view, and on a match
+    the view is not called at all. The tag also covers the query string and
+    the app's code and assets, so a deploy invalidates old pages.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return view(*args, **kwargs)
+            tag = _digest(current_app.extensions["web_cache"]["release"], key(), request.full_path, size=12)
+            if request.if_none_match.contains_weak(tag):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(tag, weak=True)
+            response.headers["Cache-Control"] = "private, no-cache"  # always revalidate, usually a 304
+            return response
+        return wrapper
+    return decorator
+
+# ======================= Flask Integration ======================= #
+def enable_web_cache(app):
+    """Compress responses, serve fingerprinted static files with long cache headers, set up asset_url()."""
+    assets = fingerprint_assets(app.static_folder)
+    source = sys.modules[app.import_name].__file__
+    with open(source, "rb") as f:
+        release = _digest(f.read(), sorted(assets.items()))
+    app.extensions["web_cache"] = {"assets": assets, "release": release}
+    app.jinja_env.globals["asset_url"] = asset_url
+
+    @app.after_request
+    def _cache_headers(response):
+        if request.endpoint == "static" and response.status_code in (200, 304):
+            filename = request.view_args["filename"]
+            if request.args.get("v") and request.args["v"] == assets.get(filename):
+                response.headers["Cache-Control"] = f"public, max-age={ASSET_MAX_AGE}, immutable"
+        return _compress_response(response)
+
+    return app
+
+def fetch_vendor(folder):
+    """Download the VENDOR files into `folder` (run once where the CDNs are reachable)."""
+    for name, url in VENDOR.items():
+        path = os.path.join(folder, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with urllib.request.urlopen(url, timeout=30) as response, open(path, "wb") as f:
+            f.write(response.read())
+        print(f"{name} <- {url}")
+
+# Usage: python web_cache.py fetch [static dir]
+if __name__ == "__main__":
+    if sys.argv[1:2] != ["fetch"]:
+        sys.exit("usage: python web_cache.py fetch [static dir]")
+    fetch_vendor(sys.argv[2] if len(sys.argv) > 2 else os.path.join(os.path.dirname(os.path.abspath(__file__)), "static"))
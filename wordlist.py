@@ -0,0 +1,138 @@
+import bisect
+import math
+import mmap
+import os
+import re
+import threading
+from array import array
+
+# One word per line; an EFF-style dice prefix ("11111<TAB>abacus") is skipped,
+# as are blank lines and lines starting with '#'
+WORD_RE = re.compile(rb"^(?:\d+\t)?([^\s#](?:[^\r\n]*\S)?)", re.MULTILINE)
+SMALL_LIST_SIZE = 65_536  # lists up to this size are also kept decoded, for speed
+WORDLIST_DIR = os.environ.get("PASSGEN_WORDLISTS", os.path.join(os.path.dirname(os.path.abspath(__file__)), "wordlists"))
+
+# ======================= Word Lists ======================= #
+class WordList:
+    """Words stored as one bytes buffer (usually a read-only mmap) plus offset arrays.
+
+    The file is opened and indexed on first use; after that word i is a
+    slice of the buffer, so a million-word list costs the file's pages plus
+    8 bytes of index per word rather than a Python str per word.
+    """
+
+    def __init__(self, name, path=None, data=None):
+        self.name = name
+        self.path = path
+        self._data = data
+        self._starts = None
+        self._ends = None
+        self._words = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_words(cls, name, words):
+        return cls(name, data="\n".join(words).encode("utf-8"))
+
+    def _index(self):
+        if self._starts is not None:
+            return
+        with self._lock:
+            if self._starts is not None:
+                return
+            data = self._data
+            if data is None:
+                with open(self.path, "rb") as f:
+                    if os.fstat(f.fileno()).st_size == 0:
+                        raise ValueError(f"Word list {self.name!r} is empty")
+                    data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            typecode = "I" if len(data) < 2 ** 32 else "Q"
+            starts, ends = array(typecode), array(typecode)
+            add_start, add_end = starts.append, ends.append
+            for match in WORD_RE.finditer(data):
+                start, end = match.span(1)
+                add_start(start)
+                add_end(end)
+            if not starts:
+                raise ValueError(f"Word list {self.name!r} is empty")
+            self._data, self._ends, self._starts = data, ends, starts
+
+    def __len__(self):
+        self._index()
+        return len(self._starts)
+
+    def __getitem__(self, i):
+        self._index()
+        return self._data[self._starts[i]:self._ends[i]].decode("utf-8")
+
+    def cached(self):
+        """A plain list of the words if the list is small, otherwise the list itself."""
+        if self._words is None and len(self) <= SMALL_LIST_SIZE:
+            self._words = [self[i] for i in range(len(self))]
+        return self._words or self
+
+    @property
+    def entropy_bits(self):
+        return math.log2(len(self))
+
+class WordListSet:
+    """Several word lists drawn from as one; words are addressed by a global index."""
+
+    def __init__(self, lists):
+        self.lists = list(lists)
+        self.name = "+".join(wl.name for wl in self.lists)
+        self._offsets = None
+
+    def _index(self):
+        if self._offsets is None:
+            offsets, total = [], 0
+            for wl in self.lists:
+                offsets.append(total)
+                total += len(wl)
+            self._offsets, self._total = offsets, total
+
+    def __len__(self):
+        self._index()
+        return self._total
+
+    def __getitem__(self, i):
+        self._index()
+        k = bisect.bisect_right(self._offsets, i) - 1
+        return self.lists[k][i - self._offsets[k]]
+
+    def cached(self):
+        return self
+
+    @property
+    def entropy_bits(self):
+        # Assumes the lists do not share words
+        return math.log2(len(self))
+
+# ======================= Registry ======================= #
+class WordLists:
+    """Named word lists: built-in ones plus every *.txt file in a directory.
+
+    Files are only listed here; each is opened and indexed the first time a
+    request uses it.
+    """
+
+    def __init__(self, directory=WORDLIST_DIR, builtin=None):
+        self.lists = dict(builtin or {})
+        if directory and os.path.isdir(directory):
+            for filename in sorted(os.listdir(directory)):
+                name, ext = os.path.splitext(filename)
+                if ext == ".txt" and name not in self.lists:
+                    self.lists[name] = WordList(name, path=os.path.join(directory, filename))
+
+    def names(self):
+        return list(self.lists)
+
+    def get(self, spec):
+        """'eff_large' or several names joined with ',' (drawn from as one list)."""
+        names = [n.strip() for n in spec.split(",") if n.strip()] if isinstance(spec, str) else list(spec)
+        unknown = [n for n in names if n not in self.lists]
+        if unknown or not names:
+            raise ValueError(f"Unknown word list: {', '.join(unknown) or spec}")
+        if len(names) == 1:
+            return self.lists[names[0]]
+        return WordListSet(self.lists[n] for n in dict.fromkeys(names))
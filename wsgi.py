@@ -0,0 +1,165 @@
+"""One WSGI entry point for all three apps.
+
+    python wsgi.py [--host 127.0.0.1] [--port 8000] [--workers 4] [--preload todo,calculator,passwords]
+    gunicorn -w 4 --preload wsgi:application
+
+/todo, /calculator and /passwords each mount one app. An app's module is
+imported and its create_app() called on the first request under its
+prefix, so startup is fast and an unused app costs no memory. Prefixes
+listed in WSGI_PRELOAD (or --preload) have their module imported before
+the workers fork, so Flask, templates and tables are loaded once and
+shared copy-on-write; create_app(), with its file handles, threads and
+history, still runs in each worker. Everything runs in one process per
+worker, so the apps share json_store, the metrics registry (GET /metrics
+shows all of them) and web_cache.
+"""
+import argparse
+import atexit
+import importlib
+import os
+import signal
+import socket
+import sys
+import threading
+
+from flask import Flask, render_template_string
+from metrics import instrument
+from web_cache import enable_web_cache
+
+MOUNTS = {
+    "/todo": "todo_app",
+    "/calculator": "calculator_app",
+    "/passwords": "password_generator",
+}
+PRELOAD = [p.strip() for p in os.environ.get("WSGI_PRELOAD", "").split(",") if p.strip()]
+WORKERS = int(os.environ.get("WSGI_WORKERS", os.cpu_count() or 1))
+
+# ======================= Lazy Dispatcher ======================= #
+class LazyDispatcher:
+    """Routes requests by path prefix to apps built on their first request.
+
+    Like werkzeug's DispatcherMiddleware, the prefix moves from PATH_INFO to
+    SCRIPT_NAME, so url_for() in the mounted app produces prefixed URLs.
+    """
+
+    def __init__(self, mounts, default):
+        self.mounts = dict(mounts)
+        self.default = default
+        self.apps = {}
+        self._lock = threading.Lock()
+
+    def preload(self, names):
+        """Import the modules for these prefixes (with or without the leading '/') now."""
+        for name in names:
+            prefix = "/" + name.strip("/")
+            if prefix not in self.mounts:
+                raise ValueError(f"Unknown app to preload: {name} (choose from {', '.join(self.mounts)})")
+            importlib.import_module(self.mounts[prefix])
+
+    def _app(self, prefix):
+        app = self.apps.get(prefix)
+        if app is None:
+            with self._lock:
+                app = self.apps.get(prefix)
+                if app is None:
+                    app = importlib.import_module(self.mounts[prefix]).create_app()
+                    # Mounted apps share one host; keep their session cookies apart
+                    app.config["SESSION_COOKIE_PATH"] = prefix
+                    self.apps[prefix] = app
+        return app
+
+    def __call__(self, environ, start_response):
+        path = environ.get("PATH_INFO", "")
+        for prefix in self.mounts:
+            if path == prefix or path.startswith(prefix + "/"):
+                environ["SCRIPT_NAME"] = environ.get("SCRIPT_NAME", "") + prefix
+                environ["PATH_INFO"] = path[len(prefix):]
+                return self._app(prefix)(environ, start_response)
+        return self.default(environ, start_response)
+
+# ======================= Host App ======================= #
+host = Flask(__name__)
+instrument(host, "host")
+enable_web_cache(host)
+
+@host.route("/")
+def index():
+    return render_template_string("""<!DOCTYPE html>
+<html lang="en"><head><meta charset="UTF-8"><title>CODSOFT apps</title></head>
+<body><ul>{% for prefix, module in mounts.items() %}<li><a href="{{ request.script_root }}{{ prefix }}/">{{ module }}</a></li>{% endfor %}</ul></body>
+</html>""", mounts=MOUNTS)
+
+application = LazyDispatcher(MOUNTS, host.wsgi_app)
+application.preload(PRELOAD)
+
+# ======================= Pre-fork Server ======================= #
+def _exit_worker(*_):
+    # A second SIGTERM must not interrupt the atexit handlers the first one started
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    sys.exit(0)
+
+def serve(load_app, host="127.0.0.1", port=8000, workers=WORKERS):
+    """Run `workers` processes that accept on one shared socket, each serving load_app().
+
+    load_app() runs in every worker after the fork. A worker that dies is
+    replaced; SIGTERM or Ctrl-C stops the workers, which run their atexit
+    handlers (history flushes) first. Returns once all workers have exited.
+    """
+    from werkzeug.serving import make_server
+    sock = socket.create_server((host, port), backlog=1024)
+    sock.set_inheritable(True)
+    children = set()
+    stopping = False
+
+    def spawn():
+        pid = os.fork()
+        if pid:
+            children.add(pid)
+            return
+        # Worker: exit through SystemExit so atexit handlers run, and never
+        # return into the parent's code
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, _exit_worker)
+        code = 0
+        try:
+            make_server(host, port, load_app(), threaded=True, fd=sock.fileno()).serve_forever()
+        except SystemExit:
+            pass
+        except BaseException:
+            import traceback
+            traceback.print_exc()
+            code = 1
+        finally:
+            atexit._run_exitfuncs()
+            os._exit(code)
+
+    def stop(*_):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    for _ in range(workers):
+        spawn()
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    print(f"Serving on http://{host}:{port} with {workers} worker(s)", flush=True)
+    while children:
+        pid, _ = os.wait()
+        children.discard(pid)
+        if not stopping:
+            spawn()
+    sock.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve all three apps from one host.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--preload", default="", help="comma-separated prefixes to import before forking")
+    args = parser.parse_args()
+    application.preload(p for p in args.preload.split(",") if p.strip())
+    serve(lambda: application, args.host, args.port, args.workers)